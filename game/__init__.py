@@ -0,0 +1,6 @@
+"""The army and snake games' modules.
+
+snake.py imports them as the game package; army.py and the benchmarks
+also run as scripts from this directory and then import each other by
+their plain names.
+"""
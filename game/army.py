@@ -1,14 +1,43 @@
 import pygame
 import random
 import os
+import struct
+import sys
 import time
+import zlib
+import ast
+import hashlib
+import heapq
+import importlib
+import itertools
+import mmap
+import queue
+import threading
+from collections import Counter, deque
 
-# Initialize
-pygame.init()
-pygame.mixer.init()  # Initialize sound mixer
+if __package__:
+    from .profiler import FrameProfiler, PhaseTimer, no_lap
+    from .scenes import Scene, run_scenes, wait_for_key
+    from .text import TextCache
+else:
+    # Run as a script (python game/army.py) or imported with game/ on sys.path
+    from profiler import FrameProfiler, PhaseTimer, no_lap
+    from scenes import Scene, run_scenes, wait_for_key
+    from text import TextCache
+
+# Headless mode runs with no window and no sound (for CI, balance tests and soak runs).
+HEADLESS = "--headless" in sys.argv or os.environ.get("ARMY_HEADLESS") == "1"
+DIRTY_RECTS = "--dirty" in sys.argv  # Repaint only the parts of the screen that changed
+USE_BUNDLE = "--no-bundle" not in sys.argv  # Load images from game/assets.bundle when it's fresh
+AUDIO_THREAD = "--audio-thread" in sys.argv  # Start sounds from a background thread
+THREADED = "--threaded" in sys.argv  # Game logic on a worker thread, drawn in between ticks
+PIXEL_HITS = "--pixel-hits" in sys.argv  # Sprites only collide where their opaque pixels touch
+
+# Importing this module opens no window and loads nothing; init() does that
+# the first time a game, replay or swarm run needs it.
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Human vs Aliens 👽")
+screen = None
+background = None
 
 # Colors
 WHITE = (255, 255, 255)
@@ -19,78 +48,742 @@ BLUE = (0, 0, 255)
 YELLOW = (255, 255, 0)
 PURPLE = (128, 0, 128)
 
+# Files that couldn't be loaded and got a stand-in (listed by --profile-startup)
+missing_files = []
+
 # Load images (with error handling)
 def load_image(name, default_color=(255, 0, 0), default_size=(50, 50)):
     try:
         img = pygame.image.load(f"game/{name}")
         return img
-    except:
+    except (FileNotFoundError, pygame.error):
+        missing_files.append(name)
         # Create a fallback surface if image can't be loaded
         surf = pygame.Surface(default_size)
         surf.fill(default_color)
         return surf
 
-# Load images
-player_img = load_image("human.png")
-alien_img = load_image("alien.png")
-bullet_img = load_image("bullet.png", WHITE, (10, 20))
-boss_img = load_image("alien.png", RED, (100, 100))
-
-# Load power-up images or create colored replacements
-health_img = load_image("health.png", GREEN, (30, 30))
-shield_img = load_image("shield.png", BLUE, (30, 30))
-rapid_fire_img = load_image("rapid.png", YELLOW, (30, 30))
-bomb_img = load_image("bomb.png", RED, (30, 30))
-
-# Background image (or create a starfield)
-try:
-    background = pygame.image.load("game/background.png")
-    background = pygame.transform.scale(background, (WIDTH, HEIGHT))
-except:
-    background = pygame.Surface((WIDTH, HEIGHT))
-    background.fill(BLACK)
-    # Create stars
-    for i in range(100):
-        x = random.randint(0, WIDTH)
-        y = random.randint(0, HEIGHT)
-        size = random.randint(1, 3)
-        pygame.draw.circle(background, WHITE, (x, y), size)
-
-# Scale images
-player_img = pygame.transform.scale(player_img, (50, 60)) 
-alien_img = pygame.transform.scale(alien_img, (50, 50))
-bullet_img = pygame.transform.scale(bullet_img, (10, 20))
-boss_img = pygame.transform.scale(boss_img, (100, 100))
-health_img = pygame.transform.scale(health_img, (30, 30))
-shield_img = pygame.transform.scale(shield_img, (30, 30))
-rapid_fire_img = pygame.transform.scale(rapid_fire_img, (30, 30))
-bomb_img = pygame.transform.scale(bomb_img, (30, 30))
+# Shared cache of scaled/rotated/generated surfaces
+class AssetCache:
+    """Builds every variant of an image once and hands out the shared surface.
+
+    Variants are keyed by (asset, size, rotation, effect). Images come from
+    register(), or from a loader registered with register_loader() that is
+    called the first time a variant is built; for them `effect` is a tuple of effect names registered with
+    register_effect(), applied in order. Generated assets (like explosion
+    frames) come from a builder function registered with register_builder()
+    that is called as builder(size, effect). Cached surfaces are converted
+    to the display format so blitting them takes pygame's fast path.
+    mask() gives the collision mask of a cached surface, also built once.
+    """
+    def __init__(self):
+        self.sources = {}    # asset name -> original surface
+        self.loaders = {}    # asset name -> function returning the original surface
+        self.builders = {}   # asset name -> function(size, effect) returning a surface
+        self.effects = {}    # effect name -> function(surface) returning a new surface
+        self.surfaces = {}   # (asset, size, rotation, effect) -> prepared surface
+        self.masks = {}      # (prepared surface, solid) -> its collision mask
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, name, surface):
+        self.sources[name] = surface
+
+    def register_loader(self, name, loader):
+        self.loaders[name] = loader
+
+    def register_builder(self, name, builder):
+        self.builders[name] = builder
+
+    def register_effect(self, name, effect):
+        self.effects[name] = effect
+
+    def get(self, asset, size=None, rotation=0, effect=None):
+        key = (asset, size, rotation, effect)
+        surf = self.surfaces.get(key)
+        if surf is None:
+            self.misses += 1
+            surf = self.surfaces[key] = self.build(asset, size, rotation, effect)
+        else:
+            self.hits += 1
+        return surf
+
+    def build(self, asset, size, rotation, effect):
+        if asset in self.builders:
+            surf = self.builders[asset](size, effect)
+        else:
+            surf = self.source(asset)
+            if size is not None and surf.get_size() != size:
+                surf = pygame.transform.scale(surf, size)
+            for name in effect or ():
+                surf = self.effects[name](surf)
+        if rotation:
+            surf = pygame.transform.rotate(surf, rotation)
+        if pygame.display.get_surface() is None:
+            return surf  # Nothing to convert to yet
+        if surf.get_flags() & pygame.SRCALPHA:
+            return surf.convert_alpha()
+        return surf.convert()
+
+    def mask(self, surf, solid=False):
+        """Collision mask of a surface get() handed out, built once; solid=True fills the whole rect"""
+        mask = self.masks.get((surf, solid))
+        if mask is None:
+            if solid:
+                mask = pygame.mask.Mask(surf.get_size(), fill=True)
+            else:
+                mask = pygame.mask.from_surface(surf)
+            self.masks[(surf, solid)] = mask
+        return mask
+
+    def source(self, name):
+        """Original image of an asset, loading it on first use"""
+        surf = self.sources.get(name)
+        if surf is None:
+            surf = self.sources[name] = self.loaders[name]()
+        return surf
+
+    def evict(self, asset=None, sources=False):
+        """Drop cached variants of one asset (or of everything); returns bytes freed.
+
+        With sources=True the original images go too; ones that have a
+        loader are loaded again if a new variant is needed.
+        """
+        keys = [key for key in self.surfaces if asset is None or key[0] == asset]
+        freed = 0
+        for key in keys:
+            surf = self.surfaces.pop(key)
+            self.masks.pop((surf, False), None)
+            self.masks.pop((surf, True), None)
+            freed += surface_bytes(surf)
+        if sources:
+            names = [name for name in self.sources if asset is None or name == asset]
+            for name in names:
+                freed += surface_bytes(self.sources.pop(name))
+        return freed
+
+    def memory(self):
+        """Bytes held by the cached variants and by the original images"""
+        return {"variants": sum(surface_bytes(surf) for surf in self.surfaces.values()),
+                "sources": sum(surface_bytes(surf) for surf in self.sources.values()),
+                "count": len(self.surfaces), "masks": len(self.masks),
+                "hits": self.hits, "misses": self.misses}
+
+def surface_bytes(surf):
+    return surf.get_pitch() * surf.get_height()
+
+assets = AssetCache()
+
+# Images, loaded the first time a variant of them is built
+assets.register_loader("player", lambda: load_image("human.png"))
+assets.register_loader("alien", lambda: load_image("alien.png"))
+assets.register_loader("bullet", lambda: load_image("bullet.png", WHITE, (10, 20)))
+assets.register_loader("boss", lambda: load_image("alien.png", RED, (100, 100)))
+
+# Power-up images or colored replacements
+assets.register_loader("health", lambda: load_image("health.png", GREEN, (30, 30)))
+assets.register_loader("shield", lambda: load_image("shield.png", BLUE, (30, 30)))
+assets.register_loader("rapid", lambda: load_image("rapid.png", YELLOW, (30, 30)))
+assets.register_loader("bomb", lambda: load_image("bomb.png", RED, (30, 30)))
+
+def load_background():
+    """Background image (or a starfield), in the display format"""
+    try:
+        background = pygame.image.load("game/background.png")
+        background = pygame.transform.scale(background, (WIDTH, HEIGHT))
+    except (FileNotFoundError, pygame.error):
+        missing_files.append("background.png")
+        background = pygame.Surface((WIDTH, HEIGHT))
+        background.fill(BLACK)
+        # Create stars
+        for i in range(100):
+            x = random.randint(0, WIDTH)
+            y = random.randint(0, HEIGHT)
+            size = random.randint(1, 3)
+            pygame.draw.circle(background, WHITE, (x, y), size)
+    return background.convert()
+
+def draw_explosion_frame(size, frame):
+    """Frame `frame` (0-4) of the explosion animation, a fading circle"""
+    width, height = size
+    surf = pygame.Surface(size, pygame.SRCALPHA)
+    pygame.draw.circle(surf, (255, 255 - frame*40, 0, 255 - frame*40), 
+                      (width//2, height//2), width//2 - frame*3)
+    return surf
+
+assets.register_builder("explosion", draw_explosion_frame)
+
+def draw_shield_layer(surf):
+    """Copy of surf with the translucent shield bubble drawn over it"""
+    width, height = surf.get_size()
+    shield = pygame.Surface((width + 20, height + 20), pygame.SRCALPHA)
+    pygame.draw.ellipse(shield, (0, 100, 255, 128), shield.get_rect())
+    shield = pygame.transform.scale(shield, (width + 10, height + 10))
+    surf = surf.copy()
+    surf.blit(shield, (-5, -5))
+    return surf
+
+assets.register_effect("shield", draw_shield_layer)
+
+# Player effects that change how the player looks, in drawing order. Each
+# combination is composed once by the asset cache, so switching is just a
+# lookup. Effects not listed here (like "rapid") don't change the image; a
+# hit flash or invulnerability blink would be a new entry plus an effect.
+PLAYER_LAYERS = ("shield",)
+
+def prebuild_assets():
+    """Build the variants the game loop asks for, so the first use doesn't hitch"""
+    for asset, size in (("player", (50, 60)), ("alien", (50, 50)), ("bullet", (10, 20)),
+                        ("boss", (100, 100)), ("health", (30, 30)), ("shield", (30, 30)),
+                        ("rapid", (30, 30)), ("bomb", (30, 30))):
+        assets.get(asset, size)
+    assets.get("bullet", (8, 16), 180)  # Enemy bullet
+    assets.get("player", (20, 25))      # Life icon
+    assets.get("player", (50, 60), 0, ("shield",))
+    for size in (20, 30, 40, 100):      # Explosion sizes
+        for frame in range(5):
+            assets.get("explosion", (size, size), 0, frame)
+    if PIXEL_HITS:
+        for surf in list(assets.surfaces.values()):
+            assets.mask(surf)
+        assets.mask(assets.get("bullet", (10, 20)), True)
+        assets.mask(assets.get("bullet", (8, 16), 180), True)
 
 # Try to load sounds, with fallback
 def load_sound(name):
+    if bundle is not None and bundle.has_sound(name):
+        sound = loaded_sounds[name] = bundle.sound(name)
+        return sound
     try:
-        sound = pygame.mixer.Sound(f"game/{name}")
+        sound = loaded_sounds[name] = pygame.mixer.Sound(f"game/{name}")
         return sound
-    except:
+    except (FileNotFoundError, pygame.error):
+        missing_files.append(name)
         return None
 
-# Load sounds
-shoot_sound = load_sound("shoot.wav")
-explosion_sound = load_sound("explosion.wav")
-powerup_sound = load_sound("powerup.wav")
-game_over_sound = load_sound("gameover.wav")
-level_up_sound = load_sound("levelup.wav")
+loaded_sounds = {}  # file name -> Sound, written into the bundle by --build-bundle
+
+# Preconverted asset bundle
+BUNDLE_PATH = "game/assets.bundle"
+
+# Raw pixel layouts frombuffer() understands, tried in order to match a surface
+PIXEL_FORMATS = ("BGRA", "RGBA", "ARGB", "RGBX")
+
+def pixel_format(surf):
+    """The PIXEL_FORMATS name whose masks match surf, so tobytes() is a plain copy"""
+    masks = surf.get_masks()
+    for fmt in PIXEL_FORMATS:
+        if surf.get_bitsize() == 32 and pygame.image.frombuffer(bytes(4), (1, 1), fmt).get_masks() == masks:
+            return fmt
+    return "RGBA" if surf.get_flags() & pygame.SRCALPHA else "RGBX"
+
+def bundle_stamp():
+    """Hash of the name, size and mtime of army.py and every image and sound in game/"""
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir("game")):
+        if name == "army.py" or name.endswith((".png", ".wav")):
+            info = os.stat(f"game/{name}")
+            digest.update(f"{name} {info.st_size} {info.st_mtime_ns}\n".encode())
+    return digest.digest()
+
+class AssetBundle:
+    """Every prepared surface and decoded sound in one memory-mapped file.
+
+    Built by --build-bundle from the AssetCache after prebuild_assets(), so
+    it holds the images already scaled, rotated and in display format. The
+    file is a header, an index (the repr of a list of entries) and the raw
+    buffers, each 64-byte aligned. Surfaces are made with frombuffer()
+    straight on the mapping, so loading copies and decodes nothing. A
+    bundle older than army.py or any image or sound isn't used at all.
+    """
+    MAGIC = b"ARMA"
+    VERSION = 1
+    HEADER = struct.Struct("<4sB32sI")  # magic, version, bundle_stamp(), index length
+    ALIGN = 64
+
+    def __init__(self, data, index):
+        self.data = data      # mmap of the whole file (surfaces point into it)
+        self.index = index    # [(kind, key, size, format, offset, length)]
+
+    @classmethod
+    def build(cls, cache, sounds, path=BUNDLE_PATH):
+        """Write the cache's surfaces and the given {name: Sound}; returns the file size"""
+        index, blobs, offset = [], [], 0
+        for key, surf in cache.surfaces.items():
+            fmt = pixel_format(surf)
+            blobs.append(pygame.image.tobytes(surf, fmt))
+            index.append(("surface", key, surf.get_size(), fmt, offset, len(blobs[-1])))
+            offset += -len(blobs[-1]) % cls.ALIGN + len(blobs[-1])
+        for name, sound in sounds.items():
+            blobs.append(sound.get_raw())
+            index.append(("sound", name, None, pygame.mixer.get_init(), offset, len(blobs[-1])))
+            offset += -len(blobs[-1]) % cls.ALIGN + len(blobs[-1])
+
+        table = repr(index).encode()
+        head = cls.HEADER.pack(cls.MAGIC, cls.VERSION, bundle_stamp(), len(table)) + table
+        with open(path, "wb") as f:
+            f.write(head + bytes(-len(head) % cls.ALIGN))
+            for blob in blobs:
+                f.write(blob + bytes(-len(blob) % cls.ALIGN))
+            return f.tell()
+
+    @classmethod
+    def open(cls, path=BUNDLE_PATH):
+        """Map a bundle; None if there isn't one or it's stale"""
+        try:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (FileNotFoundError, ValueError):
+            return None  # ValueError: empty file
+        if len(data) < cls.HEADER.size:
+            return None
+        magic, version, stamp, size = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION or stamp != bundle_stamp():
+            return None
+        start = cls.HEADER.size
+        index = ast.literal_eval(data[start:start + size].decode())
+        base = start + size + -(start + size) % cls.ALIGN
+        return cls(data, [entry[:4] + (base + entry[4], entry[5]) for entry in index])
+
+    def install(self, cache):
+        """Put every bundled surface into the cache; returns how many"""
+        view = memoryview(self.data)
+        # Display layouts with and without alpha. A buffer in another layout
+        # (there's no BGRX for opaque ones) still works, with one copy.
+        alpha_masks = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha().get_masks()
+        opaque_masks = pygame.display.get_surface().get_masks()
+        count = 0
+        for kind, key, size, fmt, offset, length in self.index:
+            if kind != "surface":
+                continue
+            surf = pygame.image.frombuffer(view[offset:offset + length], size, fmt)
+            if fmt == "RGBX":
+                if surf.get_masks() != opaque_masks:
+                    surf = surf.convert()
+            elif surf.get_masks() != alpha_masks:
+                surf = surf.convert_alpha()
+            cache.surfaces[key] = surf
+            count += 1
+        return count
+
+    def has_sound(self, name):
+        return any(entry[:2] == ("sound", name) and entry[3] == pygame.mixer.get_init()
+                   for entry in self.index)
 
-# Game clock and font
+    def sound(self, name):
+        for kind, key, size, fmt, offset, length in self.index:
+            if (kind, key) == ("sound", name):
+                return pygame.mixer.Sound(buffer=self.data[offset:offset + length])
+
+bundle = None  # The AssetBundle init() loaded from, if any
+
+# Sound voices
+# name -> (file, priority, most voices playing it at once)
+SOUNDS = {
+    "shoot": ("shoot.wav", 1, 2),
+    "explosion": ("explosion.wav", 2, 3),
+    "powerup": ("powerup.wav", 3, 1),
+    "game_over": ("gameover.wav", 4, 1),
+    "level_up": ("levelup.wav", 4, 1),
+}
+
+class MixerBackend:
+    """Plays sounds on pygame.mixer channels"""
+    def __init__(self, sounds=SOUNDS, channels=8):
+        pygame.mixer.set_num_channels(channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.sounds = {name: load_sound(entry[0]) for name, entry in sounds.items()}
+
+    def busy(self, channel):
+        return self.channels[channel].get_busy()
+
+    def start(self, channel, name):
+        sound = self.sounds[name]
+        if sound is not None:  # No file for it
+            self.channels[channel].play(sound)
+
+class NullBackend:
+    """Plays nothing, for headless runs; every channel is always free"""
+    def busy(self, channel):
+        return False
+
+    def start(self, channel, name):
+        pass
+
+class SoundManager:
+    """Hands out the mixer's voices to the sounds the game asks for.
+
+    play(name) only asks for a sound. flush(), once per tick, merges all
+    requests for the same sound into one, skips sounds that already have
+    their most voices playing, and starts the rest, highest priority
+    first, on a free channel. If none is free a sound takes over the
+    lowest-priority voice, as long as it outranks it. quality["voices"]
+    can lower the number of channels used. With threaded=True the backend
+    is called from a background thread, so the game loop never waits on
+    the mixer.
+    """
+    def __init__(self, backend, channels=8, sounds=SOUNDS, threaded=False):
+        self.backend = backend
+        self.sounds = sounds
+        self.voices = [None] * channels  # (name, priority) last started on each channel
+        self.pending = {}                # Sounds asked for since the last flush(), in order
+        self.counts = Counter()
+        self.queue = None
+        if threaded:
+            self.queue = queue.SimpleQueue()
+            threading.Thread(target=self.worker, daemon=True).start()
+
+    def play(self, name):
+        self.counts["requested"] += 1
+        if name in self.pending:
+            self.counts["merged"] += 1
+        self.pending[name] = True
+
+    def flush(self):
+        if not self.pending:
+            return
+        names = sorted(self.pending, key=lambda name: -self.sounds[name][1])
+        self.pending.clear()
+        voices = self.voices
+        limit = quality["voices"] or len(voices)
+        playing = {i for i in range(limit) if voices[i] and self.backend.busy(i)}
+        starts = []
+        for name in names:
+            _, priority, cap = self.sounds[name]
+            if sum(voices[i][0] == name for i in playing) >= cap:
+                self.counts["capped"] += 1
+                continue
+            free = [i for i in range(limit) if i not in playing]
+            if free:
+                channel = free[0]
+            else:
+                channel = min(sorted(playing), key=lambda i: voices[i][1])
+                if voices[channel][1] >= priority:
+                    self.counts["dropped"] += 1
+                    continue
+                self.counts["stolen"] += 1
+            voices[channel] = (name, priority)
+            playing.add(channel)
+            starts.append((channel, name))
+        self.counts["played"] += len(starts)
+        if self.queue is not None:
+            self.queue.put(starts)
+        else:
+            self.start(starts)
+
+    def start(self, starts):
+        for channel, name in starts:
+            self.backend.start(channel, name)
+
+    def worker(self):
+        while True:
+            self.start(self.queue.get())
+
+    def stats(self):
+        return dict(self.counts)
+
+audio = SoundManager(NullBackend())  # Swapped for one on the mixer by init()
+
+# Fonts, loaded by init()
+font = big_font = small_font = None
+text_cache = TextCache()  # Every string the game draws goes through here
+
+# Game clock
+FPS = 60
 clock = pygame.time.Clock()
-font = pygame.font.SysFont("consolas", 24)
-big_font = pygame.font.SysFont("consolas", 48)
+get_ticks = pygame.time.get_ticks  # Swapped for FixedClock.get_ticks by use_clock()
+
+class FixedClock:
+    """Drop-in for pygame.time.Clock that counts virtual time.
+
+    Every tick() advances the time by one fixed step, so the game logic sees
+    exactly the same timing as at 60 FPS. By default it never sleeps and the
+    game runs as fast as the CPU allows; with realtime=True it also waits
+    like clock.tick(), for live play that can still be replayed exactly.
+    """
+    def __init__(self, fps=FPS, realtime=False):
+        self.step = 1000 / fps
+        self.time = 0.0
+        self.pacer = pygame.time.Clock() if realtime else None
+
+    def tick(self, framerate=0):
+        if self.pacer is not None:
+            self.pacer.tick(framerate)
+        self.time += self.step
+        return int(self.step)
+
+    def get_ticks(self):
+        return int(self.time)
+
+    def get_fps(self):
+        if self.pacer is not None:
+            return self.pacer.get_fps()
+        return 1000 / self.step
+
+def use_clock(new_clock):
+    """Make the game wait on and read its time from new_clock"""
+    global clock, get_ticks
+    clock = new_clock
+    get_ticks = getattr(new_clock, "get_ticks", pygame.time.get_ticks)
+
+# Randomness for the game logic; seeded by main() so runs can be repeated
+rng = random.Random()
+
+# Player input for one tick, as bit flags (one byte per tick in a Recording)
+LEFT, RIGHT, UP, DOWN, SHOOT = 1, 2, 4, 8, 16
+
+def read_keyboard(events):
+    """Input bits from the held arrow keys and this tick's SPACE presses"""
+    keys = pygame.key.get_pressed()
+    bits = 0
+    if keys[pygame.K_LEFT]:
+        bits |= LEFT
+    if keys[pygame.K_RIGHT]:
+        bits |= RIGHT
+    if keys[pygame.K_UP]:
+        bits |= UP
+    if keys[pygame.K_DOWN]:
+        bits |= DOWN
+    for event in events:
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+            bits |= SHOOT
+    return bits
+
+class Recording:
+    """A seed plus one input byte per tick: enough to replay a run exactly.
+
+    The file is a small header followed by the zlib-compressed inputs, so an
+    hour of play takes a few kilobytes.
+    """
+    MAGIC = b"ARMY"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBQHI")  # magic, version, seed, fps, number of ticks
+
+    def __init__(self, seed=0, inputs=b""):
+        self.seed = seed
+        self.inputs = bytearray(inputs)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, FPS, len(self.inputs)))
+            f.write(zlib.compress(bytes(self.inputs), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, fps, ticks = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"{path} is not a version {cls.VERSION} army.py recording")
+        if fps != FPS:
+            raise ValueError(f"{path} was recorded at {fps} FPS, the game runs at {FPS}")
+        inputs = zlib.decompress(data[cls.HEADER.size:])
+        if len(inputs) != ticks:
+            raise ValueError(f"{path} is truncated ({len(inputs)} of {ticks} ticks)")
+        return cls(seed, inputs)
+
+    def controls(self):
+        """Input source for main() that plays the recorded bytes back in order"""
+        inputs = iter(self.inputs)
+        def playback(events):
+            return next(inputs)
+        playback.recording = self  # Lets PlayScene.restart() tell a replay from live input
+        return playback
+
+# Profiling (FrameProfiler itself lives in profiler.py)
+def draw_profiler(surf, profiler):
+    """Draw the profiler's stats overlay (refreshed every 30 frames) if it's switched on"""
+    if not profiler.overlay:
+        return
+    if not profiler.overlay_lines:
+        profiler.overlay_lines = profiler.report_lines()
+    for i, line in enumerate(profiler.overlay_lines):
+        width, height = small_font.size(line)
+        surf.text(small_font, line, YELLOW, (10 + width // 2, 80 + i * height))
+
+# Startup
+def init(headless=False, lap=no_lap, sound=None):
+    """Open the window and load what every mode needs; later calls do nothing.
+
+    Prepared images come from the asset bundle if it's fresh; otherwise
+    prebuild_assets() reads and scales the PNGs. headless (or ARMY_HEADLESS)
+    picks SDL's dummy video and audio drivers. sound says whether to use
+    the mixer or the null sound backend (default: not when headless).
+    lap(step) is called after each step, like in the main loop. Returns the
+    screen.
+    """
+    global screen, background, font, big_font, small_font, bundle
+    global audio
+    if screen is not None:
+        return screen
+    headless = headless or HEADLESS
+    if sound is None:
+        sound = not headless
+    if headless:
+        # SDL picks its drivers in pygame.init(), so this has to come first
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+    pygame.init()
+    lap("pygame.init")
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Human vs Aliens 👽")
+    lap("set_mode")
+
+    background = load_background()
+    lap("load background")
+    if USE_BUNDLE:
+        bundle = AssetBundle.open()
+        if bundle is not None:
+            bundle.install(assets)
+        lap("bundle")
+    prebuild_assets()
+    lap("images")
+
+    if sound:
+        pygame.mixer.init()  # Initialize sound mixer
+        audio = SoundManager(MixerBackend(), threaded=AUDIO_THREAD)
+        lap("sounds")
+
+    font = pygame.font.SysFont("consolas", 24)
+    big_font = pygame.font.SysFont("consolas", 48)
+    small_font = pygame.font.SysFont("consolas", 14)
+    lap("fonts")
+    return screen
+
+def profile_startup(trace_path=None):
+    """Time a cold start: every init() step, then the first tick and frame.
+
+    Returns the FrameProfiler holding one sample per step ("frame" is the
+    total); --profile-startup prints it.
+    """
+    profiler = FrameProfiler(trace_path=trace_path)
+    profiler.begin(0)
+    init(lap=profiler.lap)
+    use_clock(FixedClock(FPS))
+    world = World()
+    profiler.lap("world")
+    world.step(read_keyboard(()))
+    profiler.lap("first tick")
+    frame = DrawList()
+    world.draw(frame)
+    FullRenderer(screen, background).present(frame)
+    profiler.lap("first frame")
+    world.release()
+    profiler.close()
+    return profiler
+
+# Quality
+# Steps the QualityGovernor goes through under load, best first (None = no limit).
+# Only looks and sound change; the game plays exactly the same at every level.
+QUALITY_LEVELS = (
+    {"max_explosions": None, "frame_step": 1, "voices": None},
+    {"max_explosions": 24, "frame_step": 1, "voices": 6},
+    {"max_explosions": 12, "frame_step": 2, "voices": 4},
+    {"max_explosions": 4, "frame_step": 2, "voices": 2},
+)
+quality = QUALITY_LEVELS[0]  # Settings in use, switched by the QualityGovernor
+
+class QualityGovernor:
+    """Lowers the quality level when frames run over budget and raises it again.
+
+    frame() gets the work time of every frame (not the wait for the next
+    tick). When the average of the last `window` frames is over
+    degrade_at * budget_ms the game drops to the next of `levels`; under
+    restore_at * budget_ms it goes back up one. After a change it holds
+    for `hold` frames to let the new level show. Every change is kept in
+    self.log as (tick, old level, new level, average ms) and printed if
+    echo is on.
+    """
+    def __init__(self, budget_ms=1000 / FPS, degrade_at=0.9, restore_at=0.5, window=30,
+                 hold=60, levels=QUALITY_LEVELS, echo=True):
+        self.budget_ms = budget_ms
+        self.degrade_at = degrade_at
+        self.restore_at = restore_at
+        self.hold = hold
+        self.levels = levels
+        self.echo = echo
+        self.times = deque(maxlen=window)
+        self.level = 0
+        self.wait = 0
+        self.log = []
+
+    def frame(self, tick, ms):
+        global quality
+        self.times.append(ms)
+        if self.wait > 0:
+            self.wait -= 1
+            return
+        if len(self.times) < self.times.maxlen:
+            return
+        average = sum(self.times) / len(self.times)
+        if average > self.degrade_at * self.budget_ms and self.level < len(self.levels) - 1:
+            level = self.level + 1
+        elif average < self.restore_at * self.budget_ms and self.level > 0:
+            level = self.level - 1
+        else:
+            return
+        self.log.append((tick, self.level, level, round(average, 2)))
+        if self.echo:
+            print(f"quality {self.level} -> {level} at tick {tick}: "
+                  f"{average:.2f} ms per frame, budget {self.budget_ms:.2f} ms")
+        self.level = level
+        quality = self.levels[level]
+        self.wait = self.hold
+        self.times.clear()
+
+# Timers
+class Scheduler:
+    """Calls functions at set game times, in get_ticks() milliseconds.
+
+    Timers sit in a heap ordered by due time (ties in the order they were
+    set), so run() only looks at the timers that are due, however many
+    sprites are waiting. Times come from get_ticks(), so in headless runs
+    and replays the timers follow the FixedClock.
+    """
+    def __init__(self):
+        self.heap = []    # [due, order, callback]; callback is None once cancelled
+        self.count = 0    # Timers set so far
+        self.fired = 0
+
+    def call_at(self, due, callback):
+        """Call callback() in the first run() at or after `due`; returns the timer"""
+        timer = [due, self.count, callback]
+        self.count += 1
+        heapq.heappush(self.heap, timer)
+        return timer
+
+    def call_after(self, delay, callback):
+        """Call callback() once more than `delay` ms have passed, like `now - last > delay`"""
+        return self.call_at(get_ticks() + delay + 1, callback)
+
+    def cancel(self, timer):
+        timer[2] = None
+
+    def run(self):
+        """Fire every timer that is due; returns how many fired"""
+        now = get_ticks()
+        heap = self.heap
+        fired = 0
+        while heap and heap[0][0] <= now:
+            callback = heapq.heappop(heap)[2]
+            if callback is not None:
+                callback()
+                fired += 1
+        self.fired += fired
+        return fired
+
+    def __len__(self):
+        return len(self.heap)
+
+# Timers of the current World (the module-level one is for sprites made outside a game)
+timers = Scheduler()
 
 # Classes
 class Player(pygame.sprite.Sprite):
     def __init__(self):
         super().__init__()
-        self.image = player_img
+        self.image = assets.get("player", (50, 60))
         self.rect = self.image.get_rect()
         self.rect.centerx = WIDTH // 2
         self.rect.bottom = HEIGHT - 20
@@ -100,57 +793,61 @@ class Player(pygame.sprite.Sprite):
         self.rapid_fire = False
         self.rapid_fire_time = 0
         self.shield = False
-        self.shield_time = 0
+        self.shield_time = 0    # Power-ups run out through timers, see rapid_fire_tick()
         self.shoot_delay = 500  # Milliseconds between shots
-        self.last_shot = pygame.time.get_ticks()
-        self.original_image = self.image.copy()
-        self.shield_image = self.create_shield_image()
+        self.last_shot = get_ticks()
+        self.input = 0          # LEFT/RIGHT/UP/DOWN/SHOOT bits for this tick
+        self.effects = set()    # Active effects, see set_effect()
+        self.appearance = ()    # Layers the current image was built with
         
-    def create_shield_image(self):
-        """Create shield visual effect around player"""
-        shield_img = pygame.Surface((self.rect.width + 20, self.rect.height + 20), pygame.SRCALPHA)
-        pygame.draw.ellipse(shield_img, (0, 100, 255, 128), shield_img.get_rect())
-        return shield_img
+    def set_effect(self, name, active):
+        """Turn a visual effect on or off, switching image only if the look changes"""
+        if active:
+            self.effects.add(name)
+        else:
+            self.effects.discard(name)
+        appearance = tuple(layer for layer in PLAYER_LAYERS if layer in self.effects)
+        if appearance != self.appearance:
+            self.appearance = appearance
+            self.image = assets.get("player", (50, 60), 0, appearance or None)
 
     def update(self):
-        # Movement
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT] and self.rect.left > 0:
+        # Movement (self.input is set by the main loop every tick)
+        keys = self.input
+        if keys & LEFT and self.rect.left > 0:
             self.rect.x -= self.speed
-        if keys[pygame.K_RIGHT] and self.rect.right < WIDTH:
+        if keys & RIGHT and self.rect.right < WIDTH:
             self.rect.x += self.speed
         
         # Add up/down movement
-        if keys[pygame.K_UP] and self.rect.top > HEIGHT // 2:
+        if keys & UP and self.rect.top > HEIGHT // 2:
             self.rect.y -= self.speed
-        if keys[pygame.K_DOWN] and self.rect.bottom < HEIGHT:
+        if keys & DOWN and self.rect.bottom < HEIGHT:
             self.rect.y += self.speed
-            
-        # Auto shoot in rapid fire mode
-        now = pygame.time.get_ticks()
-        if self.rapid_fire:
-            if now - self.rapid_fire_time > 5000:  # 5 second duration
-                self.rapid_fire = False
-            elif now - self.last_shot > 100:  # Rapid fire rate
-                self.shoot()
-                self.last_shot = now
-                
-        # Check shield status
-        if self.shield:
-            if now - self.shield_time > 7000:  # 7 seconds duration
-                self.shield = False
-                
-        # Apply shield visual if active
-        if self.shield:
-            self.image = self.original_image.copy()
-            temp_shield = pygame.transform.scale(self.shield_image, 
-                                            (self.rect.width + 10, self.rect.height + 10))
-            self.image.blit(temp_shield, (-5, -5))
+
+    def rapid_fire_tick(self):
+        """Rapid fire timer: auto shoot until the power-up runs out"""
+        now = get_ticks()
+        if now - self.rapid_fire_time > 5000:  # 5 second duration
+            self.rapid_fire = False
+            self.set_effect("rapid", False)
+            return
+        if now - self.last_shot > 100:  # Rapid fire rate
+            self.shoot()
+            self.last_shot = now
+        # Picking up rapid fire again or shooting moves these times, so check again then
+        timers.call_at(min(self.rapid_fire_time + 5001, self.last_shot + 101), self.rapid_fire_tick)
+
+    def shield_tick(self):
+        """Shield timer: turn the shield off once it runs out"""
+        if get_ticks() - self.shield_time > 7000:  # 7 seconds duration
+            self.shield = False
+            self.set_effect("shield", False)
         else:
-            self.image = self.original_image.copy()
+            timers.call_at(self.shield_time + 7001, self.shield_tick)  # Picked up again
 
     def shoot(self):
-        now = pygame.time.get_ticks()
+        now = get_ticks()
         if now - self.last_shot > self.shoot_delay:
             self.last_shot = now
             
@@ -158,26 +855,31 @@ class Player(pygame.sprite.Sprite):
             if self.rapid_fire:
                 # Triple shot in rapid fire mode
                 for offset in [-10, 0, 10]:
-                    bullet = Bullet(self.rect.centerx + offset, self.rect.top)
+                    bullet = bullet_pool.acquire(self.rect.centerx + offset, self.rect.top)
                     bullets.add(bullet)
                     all_sprites.add(bullet)
             else:
                 # Normal single shot
-                bullet = Bullet(self.rect.centerx, self.rect.top)
+                bullet = bullet_pool.acquire(self.rect.centerx, self.rect.top)
                 bullets.add(bullet)
                 all_sprites.add(bullet)
                 
             # Play sound
-            if shoot_sound:
-                shoot_sound.play()
+            audio.play("shoot")
     
     def activate_rapid_fire(self):
+        if not self.rapid_fire:
+            timers.call_at(min(get_ticks() + 5001, self.last_shot + 101), self.rapid_fire_tick)
         self.rapid_fire = True
-        self.rapid_fire_time = pygame.time.get_ticks()
+        self.rapid_fire_time = get_ticks()
+        self.set_effect("rapid", True)
         
     def activate_shield(self):
+        if not self.shield:
+            timers.call_after(7000, self.shield_tick)
         self.shield = True
-        self.shield_time = pygame.time.get_ticks()
+        self.shield_time = get_ticks()
+        self.set_effect("shield", True)
         
     def get_hit(self, damage):
         if not self.shield:  # Shield prevents damage
@@ -194,46 +896,46 @@ class Player(pygame.sprite.Sprite):
 class Alien(pygame.sprite.Sprite):
     def __init__(self, level=1):
         super().__init__()
-        self.image = alien_img
+        self.image = assets.get("alien", (50, 50))
         self.rect = self.image.get_rect()
-        self.rect.x = random.randint(0, WIDTH - self.rect.width)
-        self.rect.y = random.randint(-150, -40)
+        self.rect.x = rng.randint(0, WIDTH - self.rect.width)
+        self.rect.y = rng.randint(-150, -40)
         
         # Speed increases with level
         self.level = level
-        self.base_speed = random.randint(2, 4)
+        self.base_speed = rng.randint(2, 4)
         self.speed = self.base_speed + 0.5 * (level - 1)
         
         # Occasionally aliens shoot back at higher levels
-        self.can_shoot = level > 2 and random.random() < 0.3
-        self.last_shot = pygame.time.get_ticks()
-        self.shoot_delay = random.randint(1000, 3000)
+        self.can_shoot = level > 2 and rng.random() < 0.3
+        self.shoot_delay = rng.randint(1000, 3000)
+        if self.can_shoot:
+            timers.call_after(self.shoot_delay, self.shoot_tick)
         
     def update(self):
         self.rect.y += self.speed
         
         # Loop back to top when it goes off-screen
         if self.rect.top > HEIGHT:
-            self.rect.y = random.randint(-100, -40)
-            self.rect.x = random.randint(0, WIDTH - self.rect.width)
-            
-        # Shoot if able
-        if self.can_shoot:
-            now = pygame.time.get_ticks()
-            if now - self.last_shot > self.shoot_delay:
-                self.last_shot = now
-                self.shoot()
+            self.rect.y = rng.randint(-100, -40)
+            self.rect.x = rng.randint(0, WIDTH - self.rect.width)
+
+    def shoot_tick(self):
+        """Shooting timer, every shoot_delay ms while the alien is in the game"""
+        if self.alive():
+            self.shoot()
+            timers.call_after(self.shoot_delay, self.shoot_tick)
                 
     def shoot(self):
         # Aliens shoot downward
-        enemy_bullet = EnemyBullet(self.rect.centerx, self.rect.bottom)
+        enemy_bullet = enemy_bullet_pool.acquire(self.rect.centerx, self.rect.bottom)
         enemy_bullets.add(enemy_bullet)
         all_sprites.add(enemy_bullet)
 
 class Boss(pygame.sprite.Sprite):
     def __init__(self, level):
         super().__init__()
-        self.image = boss_img
+        self.image = assets.get("boss", (100, 100))
         self.rect = self.image.get_rect()
         self.rect.centerx = WIDTH // 2
         self.rect.top = 50
@@ -243,7 +945,7 @@ class Boss(pygame.sprite.Sprite):
         self.direction = 1  # 1 for right, -1 for left
         self.speed = 2 + 0.5 * (level - 1)
         self.shoot_delay = 1000 - 50 * (level - 1)  # Shoot faster at higher levels
-        self.last_shot = pygame.time.get_ticks()
+        timers.call_after(self.shoot_delay, self.shoot_tick)
         
     def update(self):
         # Move side to side
@@ -252,123 +954,539 @@ class Boss(pygame.sprite.Sprite):
         # Change direction if hitting the edge
         if self.rect.right > WIDTH or self.rect.left < 0:
             self.direction *= -1
-            
-        # Shoot regularly
-        now = pygame.time.get_ticks()
-        if now - self.last_shot > self.shoot_delay:
-            self.last_shot = now
+
+    def shoot_tick(self):
+        """Shoot regularly while the boss is alive"""
+        if self.alive():
             self.shoot()
+            timers.call_after(self.shoot_delay, self.shoot_tick)
             
     def shoot(self):
         # Boss shoots three bullets in a spread pattern
         for offset in [-20, 0, 20]:
-            enemy_bullet = EnemyBullet(self.rect.centerx + offset, self.rect.bottom)
+            enemy_bullet = enemy_bullet_pool.acquire(self.rect.centerx + offset, self.rect.bottom)
             enemy_bullets.add(enemy_bullet)
             all_sprites.add(enemy_bullet)
-            
-    def draw_health_bar(self, surface):
-        # Health bar for boss
-        health_ratio = self.health / self.max_health
-        bar_width = self.rect.width
-        bar_height = 10
-        
-        outline_rect = pygame.Rect(self.rect.x, self.rect.y - 15, bar_width, bar_height)
-        fill_rect = pygame.Rect(self.rect.x, self.rect.y - 15, int(bar_width * health_ratio), bar_height)
-        
-        pygame.draw.rect(surface, RED, fill_rect)
-        pygame.draw.rect(surface, WHITE, outline_rect, 2)
 
-class Bullet(pygame.sprite.Sprite):
+# Object pools
+# Numbers that tell sprites apart across snapshots; id() can't, since a pooled sprite keeps its id
+sprite_serials = itertools.count(1)
+
+def sprite_serial(sprite):
+    """sprite's serial number, handing it one if it doesn't have one yet"""
+    serial = getattr(sprite, "serial", None)
+    if serial is None:
+        serial = sprite.serial = next(sprite_serials)
+    return serial
+
+class SpritePool:
+    """Keeps killed sprites of one class around so they can be reused.
+
+    acquire() hands out a recycled sprite (reset with the given arguments)
+    or builds a new one if the pool is empty. Killed sprites come back
+    through release(), up to `cap` spare sprites per pool.
+    """
+    def __init__(self, cls, cap):
+        self.cls = cls
+        self.cap = cap
+        self.free = []
+        self.live = 0           # Sprites handed out and not killed yet
+        self.hits = 0           # acquire() served from the free list
+        self.misses = 0         # acquire() had to construct a sprite
+        self.high_water = 0     # Most sprites alive at the same time
+        self.dropped = 0        # Released sprites thrown away because the pool was full
+
+    def acquire(self, *args):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(*args)
+            self.hits += 1
+        else:
+            sprite = self.cls(*args)
+            sprite.pool = self
+            self.misses += 1
+        sprite.serial = next(sprite_serials)  # A reused sprite is a new one to Snapshot.frame()
+        self.live += 1
+        if self.live > self.high_water:
+            self.high_water = self.live
+        return sprite
+
+    def release(self, sprite):
+        self.live -= 1
+        if len(self.free) < self.cap:
+            self.free.append(sprite)
+        else:
+            self.dropped += 1
+
+    def reset_stats(self):
+        """Start counting afresh; high_water starts from the sprites alive now"""
+        self.hits = self.misses = self.dropped = 0
+        self.high_water = self.live
+
+    def stats(self):
+        return {"live": self.live, "free": len(self.free), "hits": self.hits,
+                "misses": self.misses, "high_water": self.high_water, "dropped": self.dropped}
+
+class PooledSprite(pygame.sprite.Sprite):
+    """Sprite that goes back to its SpritePool when killed"""
+    pool = None
+
+    def kill(self):
+        was_alive = self.alive()
+        super().kill()
+        if was_alive and self.pool is not None:
+            self.pool.release(self)
+
+class Bullet(PooledSprite):
+    solid = True  # Only a few pixels of bullet.png are left at this size, so all of the rect hits
+
     def __init__(self, x, y):
         super().__init__()
-        self.image = bullet_img
+        self.image = assets.get("bullet", (10, 20))
         self.rect = self.image.get_rect()
+        self.speed = -10
+        self.reset(x, y)
+
+    def reset(self, x, y):
         self.rect.centerx = x
         self.rect.bottom = y
-        self.speed = -10
 
     def update(self):
         self.rect.y += self.speed
         if self.rect.bottom < 0:
             self.kill()
 
-class EnemyBullet(pygame.sprite.Sprite):
+class EnemyBullet(PooledSprite):
+    solid = True
+
     def __init__(self, x, y):
         super().__init__()
-        self.image = pygame.transform.scale(bullet_img, (8, 16))
-        self.image = pygame.transform.rotate(self.image, 180)  # Flip bullet image
+        self.image = assets.get("bullet", (8, 16), 180)  # Smaller, flipped bullet image
         self.rect = self.image.get_rect()
+        self.speed = 7
+        self.reset(x, y)
+
+    def reset(self, x, y):
         self.rect.centerx = x
         self.rect.top = y
-        self.speed = 7
 
     def update(self):
         self.rect.y += self.speed
         if self.rect.top > HEIGHT:
             self.kill()
 
-class Explosion(pygame.sprite.Sprite):
+class Explosion(PooledSprite):
     def __init__(self, center, size):
         super().__init__()
-        self.size = size
-        self.frame = 0
-        self.frames = []
-        
-        # Create simple explosion animation using circles
-        for i in range(5):
-            frame = pygame.Surface((size, size), pygame.SRCALPHA)
-            pygame.draw.circle(frame, (255, 255 - i*40, 0, 255 - i*40), 
-                              (size//2, size//2), size//2 - i*3)
-            self.frames.append(frame)
+        self.size = None
+        self.frame_rate = 50
+        self.timer = None
+        self.reset(center, size)
+
+    def reset(self, center, size):
+        # Frames are shared by all explosions of the same size
+        if size != self.size:
+            self.size = size
+            self.frames = [assets.get("explosion", (size, size), 0, i) for i in range(5)]
             
+        self.frame = 0
         self.image = self.frames[0]
         self.rect = self.image.get_rect()
         self.rect.center = center
-        self.last_update = pygame.time.get_ticks()
-        self.frame_rate = 50
-        
-    def update(self):
-        now = pygame.time.get_ticks()
-        if now - self.last_update > self.frame_rate:
-            self.last_update = now
-            self.frame += 1
-            if self.frame == len(self.frames):
-                self.kill()
-            else:
-                center = self.rect.center
-                self.image = self.frames[self.frame]
-                self.rect = self.image.get_rect()
-                self.rect.center = center
+        if self.timer is not None:
+            timers.cancel(self.timer)  # Left over from the last time this sprite was used
+        self.timer = timers.call_after(self.frame_rate, self.next_frame)
 
-class PowerUp(pygame.sprite.Sprite):
+    def next_frame(self):
+        self.frame += quality["frame_step"]  # Frames get skipped at low quality
+        if self.frame >= len(self.frames):
+            self.timer = None
+            self.kill()
+        else:
+            center = self.rect.center
+            self.image = self.frames[self.frame]
+            self.rect = self.image.get_rect()
+            self.rect.center = center
+            self.timer = timers.call_after(self.frame_rate, self.next_frame)
+
+class PowerUp(PooledSprite):
     def __init__(self, center):
         super().__init__()
-        self.type = random.choice(['shield', 'health', 'rapid', 'bomb'])
+        self.speed = 3
+        self.reset(center)
+
+    def reset(self, center):
+        self.type = rng.choice(['shield', 'health', 'rapid', 'bomb'])
         
         if self.type == 'shield':
-            self.image = shield_img
+            self.image = assets.get("shield", (30, 30))
         elif self.type == 'health':
-            self.image = health_img
+            self.image = assets.get("health", (30, 30))
         elif self.type == 'rapid':
-            self.image = rapid_fire_img
+            self.image = assets.get("rapid", (30, 30))
         elif self.type == 'bomb':
-            self.image = bomb_img
+            self.image = assets.get("bomb", (30, 30))
             
         self.rect = self.image.get_rect()
         self.rect.center = center
-        self.speed = 3
         
     def update(self):
         self.rect.y += self.speed
         if self.rect.top > HEIGHT:
             self.kill()
 
+# Caps are the most spare sprites kept per type, sized for rapid fire and bomb frames
+bullet_pool = SpritePool(Bullet, 256)
+enemy_bullet_pool = SpritePool(EnemyBullet, 256)
+explosion_pool = SpritePool(Explosion, 128)
+powerup_pool = SpritePool(PowerUp, 16)
+
+def pool_stats():
+    return {"Bullet": bullet_pool.stats(), "EnemyBullet": enemy_bullet_pool.stats(),
+            "Explosion": explosion_pool.stats(), "PowerUp": powerup_pool.stats()}
+
+def reset_pool_stats():
+    for pool in (bullet_pool, enemy_bullet_pool, explosion_pool, powerup_pool):
+        pool.reset_stats()
+
+# Collision broadphase
+class SpatialHash:
+    """Uniform grid that maps cells to the sprites whose rects touch them.
+
+    A rect query only looks at the sprites in the cells it covers, so a
+    collision check costs about the same no matter how many sprites are on
+    screen.
+    """
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}     # (cx, cy) -> set of sprites
+        self.spans = {}     # sprite -> (x0, y0, x1, y1) range of cells it is in
+        self.order = {}     # sprite -> insertion number, to keep Group order
+        self.counter = 0
+
+    def span(self, rect):
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                max(rect.left, rect.right - 1) // size, max(rect.top, rect.bottom - 1) // size)
+
+    def insert(self, sprite):
+        span = self.span(sprite.rect)
+        self.spans[sprite] = span
+        self.order[sprite] = self.counter
+        self.counter += 1
+        self._link(sprite, span)
+
+    def remove(self, sprite):
+        span = self.spans.pop(sprite, None)
+        if span is not None:
+            del self.order[sprite]
+            self._unlink(sprite, span)
+
+    def move(self, sprite):
+        """Re-file a sprite after its rect changed (cheap if it stayed in the same cells)"""
+        old = self.spans[sprite]
+        new = self.span(sprite.rect)
+        if new != old:
+            self._unlink(sprite, old)
+            self._link(sprite, new)
+            self.spans[sprite] = new
+
+    def query(self, rect):
+        """Return the sprites colliding with rect, in insertion order"""
+        x0, y0, x1, y1 = self.span(rect)
+        cells = self.cells
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        hits = [sprite for sprite in found if rect.colliderect(sprite.rect)]
+        if len(hits) > 1:
+            hits.sort(key=self.order.__getitem__)
+        return hits
+
+    def _link(self, sprite, span):
+        x0, y0, x1, y1 = span
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[(cx, cy)] = cell = set()
+                cell.add(sprite)
+
+    def _unlink(self, sprite, span):
+        x0, y0, x1, y1 = span
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells[(cx, cy)]
+                cell.discard(sprite)
+                if not cell:
+                    del cells[(cx, cy)]
+
+class HashedGroup(pygame.sprite.Group):
+    """Sprite group that keeps a SpatialHash of its members.
+
+    Call refresh() after the sprites have moved (once per frame).
+    """
+    def __init__(self, *sprites, cell_size=64):
+        self.grid = SpatialHash(cell_size)
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.grid.insert(sprite)
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.grid.remove(sprite)
+
+    def refresh(self):
+        move = self.grid.move
+        for sprite in self.spritedict:
+            move(sprite)
+
+def sprite_mask(sprite):
+    """Cached collision mask of the sprite's current image (all of it for solid sprites)"""
+    return assets.mask(sprite.image, getattr(sprite, "solid", False))
+
+def pixels_touch(a, b):
+    """True if two sprites whose rects overlap also overlap in opaque pixels"""
+    offset = (b.rect.x - a.rect.x, b.rect.y - a.rect.y)
+    return sprite_mask(a).overlap(sprite_mask(b), offset) is not None
+
+def rect_and_pixels(a, b):
+    return a.rect.colliderect(b.rect) and pixels_touch(a, b)
+
+def spritecollide(sprite, group, dokill):
+    """Same as pygame.sprite.spritecollide, but uses the grid of a HashedGroup.
+
+    With PIXEL_HITS, sprites whose rects overlap are then checked with
+    their cached masks, so the masks are only compared for the few pairs
+    that are already close.
+    """
+    if not isinstance(group, HashedGroup):
+        return pygame.sprite.spritecollide(sprite, group, dokill, rect_and_pixels if PIXEL_HITS else None)
+    crashed = group.grid.query(sprite.rect)
+    if PIXEL_HITS and crashed:
+        mask = sprite_mask(sprite)
+        x, y = sprite.rect.topleft
+        crashed = [hit for hit in crashed
+                   if mask.overlap(sprite_mask(hit), (hit.rect.x - x, hit.rect.y - y)) is not None]
+    if dokill:
+        for hit in crashed:
+            hit.kill()
+    return crashed
+
+def groupcollide(groupa, groupb, dokilla, dokillb):
+    """Same as pygame.sprite.groupcollide, but uses the grid of a HashedGroup"""
+    if not isinstance(groupb, HashedGroup):
+        return pygame.sprite.groupcollide(groupa, groupb, dokilla, dokillb, rect_and_pixels if PIXEL_HITS else None)
+    crashed = {}
+    for sprite in groupa.sprites():
+        collision = spritecollide(sprite, groupb, dokillb)
+        if collision:
+            crashed[sprite] = collision
+            if dokilla:
+                sprite.kill()
+    return crashed
+
+# Rendering
+class DrawList:
+    """Records what one frame draws, in order, instead of drawing it.
+
+    Each op is a hashable (kind, rect, a, b) tuple, so two frames can be
+    compared op by op:
+      ("blit", rect, surface, None)
+      ("rect", rect, color, width)
+      ("text", rect, (font, text, color), None)
+    """
+    def __init__(self):
+        self.ops = []
+        self.sections = []  # (name, index of its first op), see section()
+
+    def section(self, name):
+        """Start a named group of ops; renderers time each group as a profiler phase"""
+        self.sections.append((name, len(self.ops)))
+
+    def split(self):
+        """(name, ops) for each section, in order"""
+        bounds = self.sections or [("draw", 0)]
+        if bounds[0][1] > 0:
+            bounds = [("draw", 0)] + bounds
+        ends = [start for _, start in bounds[1:]] + [len(self.ops)]
+        return [(name, self.ops[start:end]) for (name, start), end in zip(bounds, ends)]
+
+    def blit(self, source, dest):
+        width, height = source.get_size()
+        self.ops.append(("blit", (dest[0], dest[1], width, height), source, None))
+
+    def blits(self, blit_sequence, doreturn=True):
+        for source, dest in blit_sequence:
+            self.blit(source, dest)
+
+    def sprites(self, group):
+        append = self.ops.append
+        for sprite in group.sprites():
+            width, height = sprite.image.get_size()
+            append(("blit", (sprite.rect.x, sprite.rect.y, width, height), sprite.image, None))
+
+    def rect(self, color, rect, width=0):
+        self.ops.append(("rect", tuple(pygame.Rect(rect)), color, width))
+
+    def text(self, font, text, color, midtop):
+        rect = pygame.Rect((0, 0), text_cache.size(font, text, color))
+        rect.midtop = midtop
+        self.ops.append(("text", tuple(rect), (font, text, color), None))
+
+def paint(target, op):
+    kind, rect, a, b = op
+    if kind == "blit":
+        target.blit(a, rect)
+    elif kind == "rect":
+        if b:
+            # Outlines as four filled strips: same pixels as pygame.draw.rect,
+            # but unlike it they stay correct when clipped
+            x, y, width, height = rect
+            target.fill(a, (x, y, width, b))
+            target.fill(a, (x, y + height - b, width, b))
+            target.fill(a, (x, y, b, height))
+            target.fill(a, (x + width - b, y, b, height))
+        else:
+            target.fill(a, rect)
+    else:
+        font, text, color = a
+        text_cache.draw(target, font, text, color, rect[:2])
+
+class FullRenderer:
+    """Redraws the whole frame: background, then every op, then flip()"""
+    def __init__(self, target, background, display=True):
+        self.target = target
+        self.background = background
+        self.display = display
+
+    def invalidate(self):
+        pass
+
+    def present(self, frame, lap=no_lap):
+        target = self.target
+        target.blit(self.background, (0, 0))
+        lap("background")
+        for name, ops in frame.split():
+            # Runs of plain blits go through one Surface.blits() call
+            run = []
+            for op in ops:
+                if op[0] == "blit":
+                    run.append((op[2], op[1]))
+                    continue
+                if run:
+                    target.blits(run, doreturn=False)
+                    run = []
+                paint(target, op)
+            if run:
+                target.blits(run, doreturn=False)
+            lap(name)
+        if self.display:
+            pygame.display.flip()
+            lap("flip")
+
+class DirtyRenderer:
+    """Repaints only the screen areas whose draw ops changed since last frame.
+
+    An area is dirty if something was drawn there last frame and isn't
+    anymore, or the other way round. Each dirty area is repainted with the
+    background and every op that touches it (clipped to the area, in frame
+    order), so the result is pixel-identical to a full redraw. Only the
+    dirty areas are sent to pygame.display.update().
+    """
+    def __init__(self, target, background, display=True):
+        self.target = target
+        self.background = background
+        self.display = display
+        self.bounds = target.get_rect()
+        self.previous = None      # Ops of the last frame, None means repaint everything
+        self.last_area = 0        # Pixels repainted in the last frame
+
+    def invalidate(self):
+        """Force a full repaint, e.g. after something else drew on the screen"""
+        self.previous = None
+
+    def present(self, frame, lap=no_lap):
+        ops = frame.ops
+        if self.previous is None:
+            dirty = [self.bounds]
+        else:
+            dirty = merge_rects(self.changed_rects(self.previous, ops), self.bounds)
+        target = self.target
+        for area in dirty:
+            target.set_clip(area)
+            target.blit(self.background, area, area)
+            for op in ops:
+                if area.colliderect(op[1]):
+                    paint(target, op)
+        target.set_clip(None)
+        self.previous = ops
+        self.last_area = sum(area.width * area.height for area in dirty)
+        lap("repaint")
+        if self.display and dirty:
+            pygame.display.update(dirty)
+            lap("flip")
+
+    def changed_rects(self, old, new):
+        old_count, new_count = Counter(old), Counter(new)
+        rects = [op[1] for op in (old_count - new_count).elements()]
+        rects += [op[1] for op in (new_count - old_count).elements()]
+        # Ops drawn in both frames still matter if their stacking order changed
+        same = old_count & new_count
+        for before, after in zip(in_counter(old, same), in_counter(new, same)):
+            if before != after:
+                rects.append(before[1])
+                rects.append(after[1])
+        return rects
+
+def in_counter(ops, counter):
+    """The ops that are in counter (a multiset), keeping their order"""
+    left = Counter(counter)
+    kept = []
+    for op in ops:
+        if left[op]:
+            left[op] -= 1
+            kept.append(op)
+    return kept
+
+def merge_rects(rects, bounds):
+    """Clip rects to bounds and merge the ones that overlap"""
+    merged = []
+    for rect in rects:
+        rect = bounds.clip(rect)
+        if not rect.width or not rect.height:
+            continue
+        # Grow rect until it no longer touches any merged rect
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
 # Game functions
+def draw_rect(surf, color, rect, width=0):
+    """pygame.draw.rect that also records onto a DrawList"""
+    if isinstance(surf, DrawList):
+        surf.rect(color, rect, width)
+    else:
+        pygame.draw.rect(surf, color, rect, width)
+
 def draw_text(surf, text, size, x, y, color=WHITE):
-    text_surf = font.render(text, True, color)
-    text_rect = text_surf.get_rect()
+    if isinstance(surf, DrawList):
+        # Rendered later, and only if this part of the screen needs repainting
+        surf.text(font, text, color, (x, y))
+        return
+    text_rect = pygame.Rect((0, 0), text_cache.size(font, text, color))
     text_rect.midtop = (x, y)
-    surf.blit(text_surf, text_rect)
+    text_cache.draw(surf, font, text, color, text_rect.topleft)
 
 def draw_health_bar(surf, x, y, health, lives):
     if health < 0:
@@ -378,14 +1496,41 @@ def draw_health_bar(surf, x, y, health, lives):
     fill = (health / 100) * BAR_LENGTH
     outline_rect = pygame.Rect(x, y, BAR_LENGTH, BAR_HEIGHT)
     fill_rect = pygame.Rect(x, y, fill, BAR_HEIGHT)
-    pygame.draw.rect(surf, GREEN, fill_rect)
-    pygame.draw.rect(surf, WHITE, outline_rect, 2)
+    draw_rect(surf, GREEN, fill_rect)
+    draw_rect(surf, WHITE, outline_rect, 2)
     
     # Draw lives
+    life_icon = assets.get("player", (20, 25))
     for i in range(lives):
-        life_icon = pygame.transform.scale(player_img, (20, 25))
         surf.blit(life_icon, (x + BAR_LENGTH + 20 + i * 30, y - 2))
 
+def draw_boss_health_bar(surf, rect, health, max_health):
+    # Health bar for boss, just above it
+    health_ratio = health / max_health
+    bar_width = rect[2]
+    bar_height = 10
+    
+    outline_rect = pygame.Rect(rect[0], rect[1] - 15, bar_width, bar_height)
+    fill_rect = pygame.Rect(rect[0], rect[1] - 15, int(bar_width * health_ratio), bar_height)
+    
+    draw_rect(surf, RED, fill_rect)
+    draw_rect(surf, WHITE, outline_rect, 2)
+
+def draw_hud(surf, hud):
+    """Draw the HUD from the plain values World.hud() returns"""
+    score, level, health, lives, boss = hud
+    
+    # Draw boss health bar if boss level
+    if boss is not None:
+        draw_boss_health_bar(surf, *boss)
+    
+    # Display score and level
+    draw_text(surf, f"Score: {score}", 24, 120, 10)
+    draw_text(surf, f"Level: {level}", 24, WIDTH - 90, 10)
+    
+    # Draw health bar and lives
+    draw_health_bar(surf, 10, 40, health, lives)
+
 def spawn_enemies(num_aliens, level):
     for _ in range(num_aliens):
         alien = Alien(level)
@@ -398,17 +1543,7 @@ def show_title_screen():
     draw_text(screen, "Arrow keys to move, SPACE to shoot", 22, WIDTH // 2, HEIGHT // 2, WHITE)
     draw_text(screen, "Press any key to begin", 18, WIDTH // 2, HEIGHT * 3 / 4, WHITE)
     pygame.display.flip()
-    
-    waiting = True
-    while waiting:
-        clock.tick(60)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return False
-            if event.type == pygame.KEYUP:
-                waiting = False
-    return True
+    return wait_for_key(event_type=pygame.KEYUP) is not None
 
 def show_game_over_screen(score):
     screen.blit(background, (0, 0))
@@ -418,19 +1553,10 @@ def show_game_over_screen(score):
     pygame.display.flip()
     
     # Play game over sound
-    if game_over_sound:
-        game_over_sound.play()
+    audio.play("game_over")
+    audio.flush()
     
-    waiting = True
-    while waiting:
-        clock.tick(60)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return False
-            if event.type == pygame.KEYUP:
-                waiting = False
-    return True
+    return wait_for_key(event_type=pygame.KEYUP) is not None
 
 def show_level_screen(level):
     screen.blit(background, (0, 0))
@@ -438,224 +1564,957 @@ def show_level_screen(level):
     pygame.display.flip()
     
     # Play level up sound
-    if level_up_sound:
-        level_up_sound.play()
+    audio.play("level_up")
+    audio.flush()
     
     # Pause briefly to show level
     pygame.time.wait(2000)
     return True
 
-# Main game loop
-def main():
-    # Game variables
-    score = 0
-    level = 1
-    boss_level = False
-    game_over = False
-    running = True
-    
-    # Show title screen
-    if not show_title_screen():
-        return
-    
-    # Sprite groups
-    global all_sprites, aliens, bullets, enemy_bullets, powerups
-    all_sprites = pygame.sprite.Group()
-    aliens = pygame.sprite.Group()
-    bullets = pygame.sprite.Group()
-    enemy_bullets = pygame.sprite.Group()
-    powerups = pygame.sprite.Group()
-    
-    # Create player
-    player = Player()
-    all_sprites.add(player)
-    
-    # Start with level 1 enemies
-    spawn_enemies(6, level)
-    
-    # Game loop
-    while running:
-        clock.tick(60)  # 60 FPS
+class World:
+    """Everything that belongs to one run of the game.
+
+    Creating a World makes its sprite groups the module-level ones the
+    sprites add bullets and aliens to; dropping it frees the whole run.
+    spawn=False leaves out the first wave (SaveState.loads() fills it in).
+    """
+    def __init__(self, spawn=True):
+        init()
+        # Game variables
+        self.score = 0
+        self.level = 1
+        self.boss_level = False
+        self.boss = None
+        self.game_over = False
+        self.level_up = False   # Set by step() when a new level starts
+
+        # Sprite groups
+        self.all_sprites = pygame.sprite.Group()
+        self.aliens = HashedGroup()
+        self.bullets = HashedGroup()
+        self.enemy_bullets = HashedGroup()
+        self.powerups = HashedGroup()
+        self.timers = Scheduler()
+        self.activate()
         
-        # Handle events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                
-            # Shoot bullet
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
-                    player.shoot()
+        # Create player
+        self.player = Player()
+        self.all_sprites.add(self.player)
         
+        # Start with level 1 enemies
+        if spawn:
+            spawn_enemies(6, self.level)
+
+    def activate(self):
+        """Make this World's groups and timers the module-level ones, so that
+        several Worlds can take turns (see env.ArmyEnv)"""
+        global all_sprites, aliens, bullets, enemy_bullets, powerups, timers
+        all_sprites, aliens, bullets = self.all_sprites, self.aliens, self.bullets
+        enemy_bullets, powerups, timers = self.enemy_bullets, self.powerups, self.timers
+
+    def step(self, keys, lap=no_lap):
+        """Advance the game by one tick with the given input bits"""
+        player = self.player
+        all_sprites, aliens, bullets = self.all_sprites, self.aliens, self.bullets
+        enemy_bullets, powerups = self.enemy_bullets, self.powerups
+        self.level_up = False
+
+        # Shoot bullet
+        player.input = keys
+        if keys & SHOOT:
+            player.shoot()
+        lap("events")
+
         # Only update game objects if not game over
-        if not game_over:
-            # Update all sprites
-            all_sprites.update()
+        if self.game_over:
+            return
+
+        # Update all sprites, then fire the timers that are due (shots, power-ups, animations)
+        all_sprites.update()
+        self.timers.run()
+        for group in (aliens, bullets, enemy_bullets, powerups):
+            group.refresh()
+        lap("update")
+        
+        # Check for collisions between player bullets and aliens
+        hits = groupcollide(aliens, bullets, True, True)
+        for hit in hits:
+            # Increase score
+            self.score += 10 * self.level
             
-            # Check for collisions between player bullets and aliens
-            hits = pygame.sprite.groupcollide(aliens, bullets, True, True)
-            for hit in hits:
-                # Increase score
-                score += 10 * level
-                
-                # Create explosion
-                expl = Explosion(hit.rect.center, 40)
-                all_sprites.add(expl)
-                
-                # Play explosion sound
-                if explosion_sound:
-                    explosion_sound.play()
+            # Create explosion
+            self.explode(hit.rect.center, 40)
+            
+            # Play explosion sound
+            audio.play("explosion")
+            
+            # Random chance to drop a power-up
+            if rng.random() < 0.1:  # 10% chance
+                power = powerup_pool.acquire(hit.rect.center)
+                all_sprites.add(power)
+                powerups.add(power)
+            
+            # Spawn replacement alien if not boss level
+            if not self.boss_level:
+                alien = Alien(self.level)
+                all_sprites.add(alien)
+                aliens.add(alien)
+        lap("collide_bullets_aliens")
+        
+        # Check for collisions between player bullets and boss
+        boss = self.boss
+        if self.boss_level and boss in all_sprites:
+            boss_hits = spritecollide(boss, bullets, True)
+            for hit in boss_hits:
+                boss.health -= 10
                 
-                # Random chance to drop a power-up
-                if random.random() < 0.1:  # 10% chance
-                    power = PowerUp(hit.rect.center)
-                    all_sprites.add(power)
-                    powerups.add(power)
+                # Create small explosion
+                self.explode(hit.rect.center, 20)
                 
-                # Spawn replacement alien if not boss level
-                if not boss_level:
-                    alien = Alien(level)
-                    all_sprites.add(alien)
-                    aliens.add(alien)
-            
-            # Check for collisions between player bullets and boss
-            if boss_level and boss in all_sprites:
-                boss_hits = pygame.sprite.spritecollide(boss, bullets, True)
-                for hit in boss_hits:
-                    boss.health -= 10
+                # Check if boss is defeated
+                if boss.health <= 0:
+                    # Big explosion
+                    self.explode(boss.rect.center, 100)
                     
-                    # Create small explosion
-                    expl = Explosion(hit.rect.center, 20)
-                    all_sprites.add(expl)
-                    
-                    # Check if boss is defeated
-                    if boss.health <= 0:
-                        # Big explosion
-                        expl = Explosion(boss.rect.center, 100)
-                        all_sprites.add(expl)
-                        
-                        # Play explosion sound
-                        if explosion_sound:
-                            explosion_sound.play()
-                            
-                        # Remove boss
-                        boss.kill()
-                        
-                        # Add score bonus
-                        score += 100 * level
+                    # Play explosion sound
+                    audio.play("explosion")
                         
-                        # End boss level, go to next level
-                        boss_level = False
-                        level += 1
-                        
-                        # Show level screen
-                        show_level_screen(level)
+                    # Remove boss
+                    boss.kill()
+                    
+                    # Add score bonus
+                    self.score += 100 * self.level
+                    
+                    # End boss level, go to next level (the play scene shows the level screen)
+                    self.boss_level = False
+                    self.level += 1
+                    self.level_up = True
+                    
+                    # Clear all bullets
+                    for bullet in bullets.sprites():
+                        bullet.kill()
+                    for bullet in enemy_bullets.sprites():
+                        bullet.kill()
                         
-                        # Clear all bullets
-                        for bullet in bullets:
-                            bullet.kill()
-                        for bullet in enemy_bullets:
-                            bullet.kill()
-                            
-                        # Spawn enemies for new level
-                        spawn_enemies(6 + level, level)
+                    # Spawn enemies for new level
+                    spawn_enemies(6 + self.level, self.level)
+        lap("collide_bullets_boss")
+        
+        # Check for collisions between player and alien bullets
+        if spritecollide(player, enemy_bullets, True):
+            self.game_over = player.get_hit(25)  # Enemy bullets do 25 damage
             
-            # Check for collisions between player and alien bullets
-            if pygame.sprite.spritecollide(player, enemy_bullets, True):
-                game_over = player.get_hit(25)  # Enemy bullets do 25 damage
-                
-                # Create small explosion at player position
-                expl = Explosion(player.rect.center, 30)
-                all_sprites.add(expl)
+            # Create small explosion at player position
+            self.explode(player.rect.center, 30)
+        lap("collide_enemy_bullets")
+        
+        # Check if aliens hit player
+        hits = spritecollide(player, aliens, True)
+        if hits:
+            # Player takes damage
+            self.game_over = player.get_hit(50)  # Collisions do 50 damage
             
-            # Check if aliens hit player
-            hits = pygame.sprite.spritecollide(player, aliens, True)
-            if hits:
-                # Player takes damage
-                game_over = player.get_hit(50)  # Collisions do 50 damage
-                
-                # Create explosion
-                expl = Explosion(hits[0].rect.center, 40)
-                all_sprites.add(expl)
-                
-                # Play explosion sound
-                if explosion_sound:
-                    explosion_sound.play()
-                
-                # Spawn replacement alien
-                alien = Alien(level)
-                all_sprites.add(alien)
-                aliens.add(alien)
+            # Create explosion
+            self.explode(hits[0].rect.center, 40)
             
-            # Check if player got power-up
-            hits = pygame.sprite.spritecollide(player, powerups, True)
-            for hit in hits:
-                if hit.type == 'shield':
-                    player.activate_shield()
-                elif hit.type == 'health':
-                    player.health = min(100, player.health + 30)  # Add 30 health, max 100
-                elif hit.type == 'rapid':
-                    player.activate_rapid_fire()
-                elif hit.type == 'bomb':
-                    # Destroy all enemies on screen
-                    for alien in aliens:
-                        # Create explosion at each alien
-                        expl = Explosion(alien.rect.center, 40)
-                        all_sprites.add(expl)
-                        # Add score
-                        score += 10 * level
-                    # Kill all aliens
-                    for alien in aliens:
-                        alien.kill()
-                    # Repopulate aliens
-                    if not boss_level:
-                        spawn_enemies(6 + level, level)
-                
-                # Play power-up sound
-                if powerup_sound:
-                    powerup_sound.play()
+            # Play explosion sound
+            audio.play("explosion")
             
-            # Check if all aliens are defeated and not in boss level
-            if len(aliens) == 0 and not boss_level:
-                # Every 3 levels is a boss level
-                if level % 3 == 0:
-                    boss_level = True
-                    boss = Boss(level // 3)  # Boss strength increases
-                    all_sprites.add(boss)
-                else:
-                    # Regular level up
-                    level += 1
-                    show_level_screen(level)
-                    spawn_enemies(6 + level, level)  # More aliens each level
-        
-        # Draw / render
-        screen.blit(background, (0, 0))
-        all_sprites.draw(screen)
-        
-        # Draw boss health bar if boss level
-        if boss_level and 'boss' in locals() and boss in all_sprites:
-            boss.draw_health_bar(screen)
+            # Spawn replacement alien
+            alien = Alien(self.level)
+            all_sprites.add(alien)
+            aliens.add(alien)
+        lap("collide_aliens_player")
         
-        # Display score and level
-        draw_text(screen, f"Score: {score}", 24, 120, 10)
-        draw_text(screen, f"Level: {level}", 24, WIDTH - 90, 10)
-        
-        # Draw health bar and lives
-        draw_health_bar(screen, 10, 40, player.health, player.lives)
+        # Check if player got power-up
+        hits = spritecollide(player, powerups, True)
+        for hit in hits:
+            if hit.type == 'shield':
+                player.activate_shield()
+            elif hit.type == 'health':
+                player.health = min(100, player.health + 30)  # Add 30 health, max 100
+            elif hit.type == 'rapid':
+                player.activate_rapid_fire()
+            elif hit.type == 'bomb':
+                # Destroy all enemies on screen
+                for alien in aliens:
+                    # Create explosion at each alien
+                    self.explode(alien.rect.center, 40)
+                    # Add score
+                    self.score += 10 * self.level
+                # Kill all aliens
+                for alien in aliens.sprites():
+                    alien.kill()
+                # Repopulate aliens
+                if not self.boss_level:
+                    spawn_enemies(6 + self.level, self.level)
+            
+            # Play power-up sound
+            audio.play("powerup")
+        lap("powerups")
         
-        # If game over, show game over screen
-        if game_over:
-            if show_game_over_screen(score):
-                # Restart the game
-                return main()
+        # Check if all aliens are defeated and not in boss level
+        if len(aliens) == 0 and not self.boss_level:
+            # Every 3 levels is a boss level
+            if self.level % 3 == 0:
+                self.boss_level = True
+                self.boss = Boss(self.level // 3)  # Boss strength increases
+                all_sprites.add(self.boss)
             else:
-                running = False
+                # Regular level up
+                self.level += 1
+                self.level_up = True
+                spawn_enemies(6 + self.level, self.level)  # More aliens each level
+        lap("level")
+
+    def draw(self, frame):
+        """Record the sprites and HUD into a DrawList"""
+        frame.section("sprites")
+        frame.sprites(self.all_sprites)
+        frame.section("hud")
+        draw_hud(frame, self.hud())
+
+    def hud(self):
+        """(score, level, health, lives, boss) for draw_hud(); boss is None or
+        (rect, health, max_health) while a boss is showing"""
+        boss = None
+        if self.boss_level and self.boss in self.all_sprites:
+            boss = (tuple(self.boss.rect), self.boss.health, self.boss.max_health)
+        return (self.score, self.level, self.player.health, self.player.lives, boss)
+
+    def snapshot(self, tick):
+        """Freeze what the screen shows after this tick into a Snapshot"""
+        sprites = tuple((sprite_serial(sprite), sprite.image, sprite.rect.x, sprite.rect.y)
+                        for sprite in self.all_sprites.sprites())
+        return Snapshot(tick, time.perf_counter(), sprites, self.hud())
+
+    def explode(self, center, size):
+        """Start an explosion, unless the quality level caps how many are showing"""
+        cap = quality["max_explosions"]
+        if cap is None or explosion_pool.live < cap:
+            self.all_sprites.add(explosion_pool.acquire(center, size))
+
+    def release(self):
+        """Hand this run's sprites back to their pools"""
+        for sprite in self.all_sprites.sprites():
+            sprite.kill()
+
+    def checksum(self):
+        """CRC of everything that matters in the world, to compare runs"""
+        player = self.player
+        state = [self.score, self.level, player.health, player.lives, get_ticks()]
+        for sprite in self.all_sprites:
+            if isinstance(sprite, Explosion):
+                continue  # Only for looks, and the quality level can drop them
+            state.append((type(sprite).__name__, tuple(sprite.rect), getattr(sprite, "type", None)))
+        return zlib.crc32(repr(state).encode())
+
+# Save states
+CHECKPOINT_TICKS = FPS * 10  # How often PlayScene.autosave() writes a checkpoint
+
+class SaveState:
+    """Binary snapshot of a whole World, to carry on from later.
+
+    dumps() packs the score and level, the player, every sprite in drawing
+    order, the pending timers and the RNG into a few kilobytes of fixed-size
+    records, and loads() builds a World from them that plays on exactly as
+    the saved one would have. A FixedClock is wound back to the saved game
+    time; on the wall clock the saved times are moved to now instead.
+    """
+    MAGIC = b"ARMS"
+    VERSION = 1
+    HEADER = struct.Struct("<4sBHdqQII")   # magic, version, fps, clock time, get_ticks(), timers set, sprites, timers
+    WORLD = struct.Struct("<qI??")         # score, level, boss level, game over
+    PLAYER = struct.Struct("<iiiB?q?qq")   # x, y, health, lives, rapid fire and since, shield and since, last shot
+    RNG = struct.Struct("<625I?d")         # Mersenne Twister state and index, pending gauss() value
+    TIMER = struct.Struct("<BIqQ")         # callback, its sprite's number, due, order
+    # One record per sprite: kind byte, then the fields of that kind
+    PLAYER_KIND, ALIEN, BOSS, BULLET, ENEMY_BULLET, POWERUP, EXPLOSION = range(7)
+    SPRITES = {
+        ALIEN: struct.Struct("<iiBdH?i"),  # x, y, base speed, speed, level, can shoot, shoot delay
+        BOSS: struct.Struct("<iiiiHbdi"),  # x, y, health, max health, level, direction, speed, shoot delay
+        BULLET: struct.Struct("<ii"),
+        ENEMY_BULLET: struct.Struct("<ii"),
+        POWERUP: struct.Struct("<iiB"),    # x, y, type
+        EXPLOSION: struct.Struct("<iiHB"), # center, size, frame
+    }
+    POWERUP_TYPES = ('shield', 'health', 'rapid', 'bomb')
+
+    @classmethod
+    def timer_callbacks(cls):
+        # Every kind of timer the game sets, by number
+        return (Player.rapid_fire_tick, Player.shield_tick, Alien.shoot_tick,
+                Boss.shoot_tick, Explosion.next_frame)
+
+    @staticmethod
+    def blank(sprite_cls, image):
+        """A sprite_cls that skips __init__ (no random position, no timer), for loads() to fill in"""
+        sprite = sprite_cls.__new__(sprite_cls)
+        pygame.sprite.Sprite.__init__(sprite)
+        sprite.image = image
+        sprite.rect = image.get_rect()
+        return sprite
+
+    @classmethod
+    def dumps(cls, world):
+        player = world.player
+        kinds = {Player: cls.PLAYER_KIND, Alien: cls.ALIEN, Boss: cls.BOSS, Bullet: cls.BULLET,
+                 EnemyBullet: cls.ENEMY_BULLET, PowerUp: cls.POWERUP, Explosion: cls.EXPLOSION}
+        structs = cls.SPRITES
+        numbers = {}
+        records = []
+        for sprite in world.all_sprites.sprites():
+            kind = kinds[type(sprite)]
+            numbers[sprite] = len(numbers)
+            x, y = sprite.rect.topleft
+            if kind == cls.ALIEN:
+                fields = (x, y, sprite.base_speed, sprite.speed, sprite.level, sprite.can_shoot, sprite.shoot_delay)
+            elif kind == cls.BOSS:
+                fields = (x, y, sprite.health, sprite.max_health, sprite.level, sprite.direction,
+                          sprite.speed, sprite.shoot_delay)
+            elif kind == cls.POWERUP:
+                fields = (x, y, cls.POWERUP_TYPES.index(sprite.type))
+            elif kind == cls.EXPLOSION:
+                fields = sprite.rect.center + (sprite.size, sprite.frame)
+            elif kind == cls.PLAYER_KIND:
+                records.append(b"\0")
+                continue
+            else:
+                fields = (x, y)
+            records.append(bytes((kind,)) + structs[kind].pack(*fields))
+
+        # Timers of sprites that are gone would do nothing, so they are left out
+        callbacks = cls.timer_callbacks()
+        timers = []
+        for due, order, callback in world.timers.heap:
+            if callback is not None and callback.__self__ in numbers:
+                timers.append(cls.TIMER.pack(callbacks.index(callback.__func__),
+                                             numbers[callback.__self__], due, order))
+
+        version, state, gauss = rng.getstate()
+        clock_time = clock.time if isinstance(clock, FixedClock) else 0.0
+        return b"".join([
+            cls.HEADER.pack(cls.MAGIC, cls.VERSION, FPS, clock_time, get_ticks(), world.timers.count,
+                            len(records), len(timers)),
+            cls.WORLD.pack(world.score, world.level, world.boss_level, world.game_over),
+            cls.PLAYER.pack(player.rect.x, player.rect.y, player.health, player.lives,
+                            player.rapid_fire, player.rapid_fire_time, player.shield,
+                            player.shield_time, player.last_shot),
+            cls.RNG.pack(*state, gauss is not None, gauss or 0.0),
+        ] + records + timers)
+
+    @classmethod
+    def loads(cls, data):
+        """A new World (now the current one) from bytes made by dumps()"""
+        magic, version, fps, clock_time, saved_now, timer_count, sprite_count, timers_saved = \
+            cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"not a version {cls.VERSION} army.py save state")
+        if fps != FPS:
+            raise ValueError(f"saved at {fps} FPS, the game runs at {FPS}")
+        if isinstance(clock, FixedClock):
+            clock.time = clock_time
+        shift = get_ticks() - saved_now  # Moves saved times onto this clock
+        offset = cls.HEADER.size
+
+        world = World(spawn=False)
+        world.score, world.level, world.boss_level, world.game_over = cls.WORLD.unpack_from(data, offset)
+        offset += cls.WORLD.size
+        player = world.player
+        (player.rect.x, player.rect.y, player.health, player.lives, player.rapid_fire, rapid_fire_time,
+         player.shield, shield_time, last_shot) = cls.PLAYER.unpack_from(data, offset)
+        offset += cls.PLAYER.size
+        player.rapid_fire_time = rapid_fire_time + shift
+        player.shield_time = shield_time + shift
+        player.last_shot = last_shot + shift
+        player.set_effect("rapid", player.rapid_fire)
+        player.set_effect("shield", player.shield)
+        rng_state = cls.RNG.unpack_from(data, offset)
+        offset += cls.RNG.size
+
+        all_sprites, structs = world.all_sprites, cls.SPRITES
+        sprites = []
+        for _ in range(sprite_count):
+            kind = data[offset]
+            offset += 1
+            if kind == cls.PLAYER_KIND:
+                all_sprites.remove(player)  # Back in at its place in the drawing order
+                all_sprites.add(player)
+                sprites.append(player)
+                continue
+            fields = structs[kind].unpack_from(data, offset)
+            offset += structs[kind].size
+            if kind == cls.ALIEN:
+                sprite = cls.blank(Alien, assets.get("alien", (50, 50)))
+                (x, y, sprite.base_speed, sprite.speed, sprite.level, sprite.can_shoot,
+                 sprite.shoot_delay) = fields
+                groups = (all_sprites, world.aliens)
+            elif kind == cls.BOSS:
+                sprite = world.boss = cls.blank(Boss, assets.get("boss", (100, 100)))
+                (x, y, sprite.health, sprite.max_health, sprite.level, sprite.direction,
+                 sprite.speed, sprite.shoot_delay) = fields
+                groups = (all_sprites,)
+            elif kind == cls.BULLET:
+                sprite = bullet_pool.acquire(0, 0)
+                x, y = fields
+                groups = (all_sprites, world.bullets)
+            elif kind == cls.ENEMY_BULLET:
+                sprite = enemy_bullet_pool.acquire(0, 0)
+                x, y = fields
+                groups = (all_sprites, world.enemy_bullets)
+            elif kind == cls.POWERUP:
+                sprite = powerup_pool.acquire((0, 0))
+                x, y, power = fields
+                sprite.type = cls.POWERUP_TYPES[power]
+                sprite.image = assets.get(sprite.type, (30, 30))
+                sprite.rect = sprite.image.get_rect()
+                groups = (all_sprites, world.powerups)
+            elif kind == cls.EXPLOSION:
+                centerx, centery, size, frame = fields
+                sprite = explosion_pool.acquire((centerx, centery), size)
+                sprite.frame = frame
+                sprite.image = sprite.frames[frame]
+                sprite.rect = sprite.image.get_rect(center=(centerx, centery))
+                x, y = sprite.rect.topleft
+                groups = (all_sprites,)
+            else:
+                raise ValueError(f"unknown sprite kind {kind} in save state")
+            sprite.rect.topleft = (x, y)
+            sprite.add(*groups)
+            sprites.append(sprite)
+
+        # Pooled sprites set timers of their own when reset; the saved ones replace them
+        callbacks = cls.timer_callbacks()
+        heap = []
+        for _ in range(timers_saved):
+            callback, number, due, order = cls.TIMER.unpack_from(data, offset)
+            offset += cls.TIMER.size
+            sprite = sprites[number]
+            timer = [due + shift, order, callbacks[callback].__get__(sprite)]
+            if isinstance(sprite, Explosion):
+                sprite.timer = timer
+            heap.append(timer)
+        heapq.heapify(heap)
+        world.timers.heap = heap
+        world.timers.count = timer_count
+
+        # Last, since resetting pooled sprites draws random numbers
+        rng.setstate((3, rng_state[:625], rng_state[626] if rng_state[625] else None))
+        return world
+
+    @classmethod
+    def save(cls, world, path):
+        """Write world to path; the old file stays whole until the new one is complete"""
+        data = cls.dumps(world)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.loads(f.read())
+
+# Scenes
+class TitleScene(Scene):
+    def __init__(self, play):
+        self.play = play
+
+    def run(self):
+        return self.play if show_title_screen() else None
+
+class LevelScene(Scene):
+    """Level banner between two levels; goes back to the same play scene"""
+    def __init__(self, play):
+        self.play = play
+
+    def run(self):
+        show_level_screen(self.play.world.level)
+        return self.play
+
+class GameOverScene(Scene):
+    def __init__(self, play):
+        self.play = play
+
+    def run(self):
+        if show_game_over_screen(self.play.world.score):
+            # Restart the game with a fresh play scene
+            return self.play.restart()
+        return None
+
+class PlayScene(Scene):
+    """One run of the game; see main() for the arguments.
+
+    run() returns a LevelScene (which comes back here and carries on) when
+    a new level starts, a GameOverScene at game over, or None when the run
+    ends. In headless runs the level and game over screens are skipped and
+    the summary of the run is left in self.result.
+    """
+    def __init__(self, headless=False, max_ticks=None, renderer=None, seed=None,
+                 controls=read_keyboard, record=None, profiler=None, governor=None,
+                 state=None, checkpoint=None):
+        self.headless = headless
+        self.max_ticks = max_ticks
+        self.renderer = renderer
+        self.seed = seed
+        self.controls = controls
+        self.record = record
+        self.profiler = profiler
+        self.governor = governor
+        self.state = state
+        self.checkpoint = checkpoint
+        self.world = None
+        self.ticks = 0
+        self.result = None
+
+    def restart(self):
+        """Fresh run with the same settings (not recorded, new seed)"""
+        controls, max_ticks = self.controls, self.max_ticks
+        if getattr(controls, "recording", None) is not None:
+            # A replay's inputs (and its length) are used up and belong to its seed,
+            # so the new run is played from the keyboard
+            controls, max_ticks = read_keyboard, None
+        return type(self)(self.headless, max_ticks, self.renderer, None,
+                          controls, None, self.profiler, self.governor, None, self.checkpoint)
+
+    def start(self):
+        if self.seed is None:
+            self.seed = random.getrandbits(63)
+        rng.seed(self.seed)
+        if self.record is not None:
+            self.record.seed = self.seed
+        if self.state is not None:
+            self.world = SaveState.loads(self.state)  # Brings its own RNG state
+        else:
+            self.world = World()
+
+    def run(self):
+        if self.world is None:
+            self.start()
+        world, profiler, renderer, governor = self.world, self.profiler, self.renderer, self.governor
+        if renderer is not None:
+            renderer.invalidate()  # Something else was on screen
+        lap = profiler.lap if profiler else no_lap
         
-        pygame.display.flip()
-    
+        # Game loop
+        while True:
+            if self.max_ticks is not None and self.ticks >= self.max_ticks:
+                return self.finish()
+            clock.tick(FPS)  # 60 FPS
+            frame_start = time.perf_counter()
+            self.ticks += 1
+            if profiler:
+                profiler.begin(self.ticks)
+            
+            # Handle events
+            events = pygame.event.get()
+            for event in events:
+                if event.type == pygame.QUIT:
+                    return self.finish()
+                if profiler and event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    profiler.overlay = not profiler.overlay
+
+            # Player input for this tick
+            keys = self.controls(events)
+            if self.record is not None:
+                self.record.inputs.append(keys)
+
+            world.step(keys, lap)
+            audio.flush()
+            self.autosave()
+
+            # Headless runs stop at game over and skip the screens in between
+            if self.headless:
+                if world.game_over:
+                    return self.finish()
+            elif world.game_over:
+                world.release()
+                self.pause_profiler()
+                return GameOverScene(self)
+            elif world.level_up:
+                self.pause_profiler()
+                return LevelScene(self)
+            if renderer is None:
+                continue
+
+            # Draw / render (recorded into a DrawList, painted by the renderer)
+            frame = DrawList()
+            world.draw(frame)
+            if profiler:
+                frame.section("overlay")
+                draw_profiler(frame, profiler)
+            lap("record")
+            renderer.present(frame, lap)
+            if governor:
+                governor.frame(self.ticks, (time.perf_counter() - frame_start) * 1000)
+
+    def finish(self):
+        self.pause_profiler()
+        world = self.world
+        self.result = {"score": world.score, "level": world.level, "ticks": self.ticks,
+                       "seed": self.seed, "game_time_ms": get_ticks(),
+                       "game_over": world.game_over, "checksum": world.checksum(),
+                       "pools": pool_stats()}
+        return None
+
+    def pause_profiler(self):
+        # Closed by main() once the scenes are over; a restart carries on with the same one
+        if self.profiler:
+            self.profiler.pause()
+
+    def autosave(self):
+        """Write the world to self.checkpoint every CHECKPOINT_TICKS, to resume from after a crash"""
+        if self.checkpoint is not None and self.ticks % CHECKPOINT_TICKS == 0:
+            SaveState.save(self.world, self.checkpoint)
+
+# Threaded simulation
+class Snapshot:
+    """What the screen shows after one tick, frozen so another thread can draw it.
+
+    sprites is a tuple of (serial, image, x, y) and hud is World.hud(). Both
+    are tuples of values that the simulation never changes afterwards, so
+    a Snapshot can be handed to the render thread without a lock.
+    """
+    __slots__ = ("tick", "time", "sprites", "hud")
+    MAX_GLIDE = 100  # Sprites that moved further than this were respawned or wrapped; don't glide them
+
+    def __init__(self, tick, time, sprites, hud):
+        self.tick = tick
+        self.time = time  # time.perf_counter() when the tick finished
+        self.sprites = sprites
+        self.hud = hud
+
+    def frame(self, previous=None, alpha=1.0):
+        """A DrawList of this snapshot, each sprite moved back towards where it
+        was in previous: alpha 0 draws it there, alpha 1 where it is now"""
+        frame = DrawList()
+        frame.section("sprites")
+        append = frame.ops.append
+        before = {}
+        if previous is not None and alpha < 1:
+            before = {serial: (x, y) for serial, image, x, y in previous.sprites}
+        glide = self.MAX_GLIDE
+        for serial, image, x, y in self.sprites:
+            if serial in before:
+                old_x, old_y = before[serial]
+                if abs(x - old_x) < glide and abs(y - old_y) < glide:
+                    x = round(old_x + (x - old_x) * alpha)
+                    y = round(old_y + (y - old_y) * alpha)
+            width, height = image.get_size()
+            append(("blit", (x, y, width, height), image, None))
+        frame.section("hud")
+        draw_hud(frame, self.hud)
+        return frame
+
+class ThreadedPlayScene(PlayScene):
+    """PlayScene with the game logic on a worker thread.
+
+    The worker steps the World at a fixed FPS, on a FixedClock so the run
+    can still be recorded and replayed tick for tick, and publishes a
+    Snapshot after every tick as the pair (previous, latest). The main
+    thread handles the window and draws the latest pair as often as
+    render_fps allows, gliding the sprites from one tick to the next. A slow
+    frame no longer holds the game back, and a slow tick doesn't freeze the
+    screen. Python runs one thread at a time, so this buys smoothness and
+    steadier ticks rather than extra speed.
+    """
+    render_fps = 120
+
+    def run(self):
+        if self.world is None:
+            self.start()
+        renderer, governor = self.renderer, self.governor
+        if renderer is not None:
+            renderer.invalidate()  # Something else was on screen
+        self.snapshots = (None, None)  # (previous, latest); replaced, never changed
+        self.events = []               # Events for the next tick, passed over under self.lock
+        self.lock = threading.Lock()
+        self.outcome = None            # "game_over", "level_up" or "end" once the worker stops
+        self.error = None
+        self.quit = False
+        worker = threading.Thread(target=self.simulate, name="simulation", daemon=True)
+        worker.start()
+        render_clock = pygame.time.Clock()
+        step = 1 / FPS
+        profiler = self.profiler
+        timer = PhaseTimer(profiler) if profiler else None
+        lap = timer.lap if timer else no_lap
+
+        while self.outcome is None:
+            render_clock.tick(self.render_fps)
+            events = pygame.event.get()
+            if any(event.type == pygame.QUIT for event in events):
+                self.quit = True
+                break
+            if profiler and any(event.type == pygame.KEYDOWN and event.key == pygame.K_F3 for event in events):
+                profiler.overlay = not profiler.overlay
+            with self.lock:
+                self.events.extend(events)
+            previous, latest = self.snapshots
+            if renderer is None or latest is None:
+                continue
+            frame_start = time.perf_counter()
+            if timer:
+                timer.start()
+            # How far we are into the tick after the latest one
+            alpha = min(1.0, (frame_start - latest.time) / step)
+            frame = latest.frame(previous, alpha)
+            if profiler:
+                frame.section("overlay")
+                draw_profiler(frame, profiler)
+            lap("record")
+            renderer.present(frame, lap)
+            if governor:
+                governor.frame(latest.tick, (time.perf_counter() - frame_start) * 1000)
+
+        worker.join()
+        if self.error is not None:
+            raise self.error
+        world = self.world
+        if self.quit or self.outcome == "end":
+            return self.finish()
+        self.pause_profiler()
+        if self.outcome == "game_over":
+            world.release()
+            return GameOverScene(self)
+        return LevelScene(self)
+
+    def simulate(self):
+        """The worker: one tick every 1/FPS s (or flat out when headless with no
+        renderer) until game over, a new level or quit"""
+        world, profiler = self.world, self.profiler
+        lap = profiler.lap if profiler else no_lap
+        step = 1 / FPS
+        next_tick = time.perf_counter()
+        # With nothing to watch, headless runs go as fast as they can, like PlayScene's
+        paced = not (self.headless and self.renderer is None)
+        try:
+            while not self.quit:
+                if self.max_ticks is not None and self.ticks >= self.max_ticks:
+                    break
+                if paced:
+                    delay = next_tick - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    elif delay < -5 * step:
+                        next_tick = time.perf_counter()  # Too far behind to catch up; drop the ticks
+                    next_tick += step
+                clock.tick(FPS)
+                self.ticks += 1
+                if profiler:
+                    profiler.begin(self.ticks)
+
+                with self.lock:
+                    events, self.events = self.events, []
+                keys = self.controls(events)
+                if self.record is not None:
+                    self.record.inputs.append(keys)
+
+                world.step(keys, lap)
+                audio.flush()
+                self.autosave()
+                self.snapshots = (self.snapshots[1], world.snapshot(self.ticks))
+
+                if world.game_over:
+                    self.outcome = "end" if self.headless else "game_over"
+                    return
+                if world.level_up and not self.headless:
+                    self.outcome = "level_up"
+                    return
+        except BaseException as error:
+            self.error = error
+        self.outcome = "end"
+
+# Main game loop
+def main(headless=HEADLESS, max_ticks=None, renderer=None, seed=None, controls=None,
+         record=None, game_clock=None, profiler=None, governor=None, threaded=THREADED,
+         state=None, checkpoint=None):
+    """Run the game.
+
+    With headless=True there are no title/level screens and no drawing, and
+    the simulation advances in fixed 1/60 s ticks as fast as possible. The
+    run ends at game over or after max_ticks ticks and returns a summary dict.
+    A renderer passed in is used even in headless runs.
+
+    seed seeds the game's RNG (random if None). controls(events) returns the
+    input bits for each tick (default: the keyboard). A Recording passed as
+    record gets the seed and every tick's input. game_clock replaces the
+    clock; recorded or scripted runs default to virtual time so they can be
+    replayed exactly. A FrameProfiler passed as profiler times every phase
+    of the loop (F3 toggles its overlay). A QualityGovernor passed as
+    governor trades explosions, animation frames and sounds for frame rate
+    when rendering falls behind. threaded=True runs the game logic on its
+    own thread and draws in between ticks (see ThreadedPlayScene).
+
+    state is SaveState.dumps() bytes to carry on from instead of a new game;
+    with a checkpoint path the world is saved there every CHECKPOINT_TICKS.
+    """
+    global quality
+    init(headless)
+    quality = governor.levels[governor.level] if governor else QUALITY_LEVELS[0]
+    if game_clock is not None:
+        use_clock(game_clock)
+    elif headless or threaded:
+        # Virtual time instead of the wall clock (the worker thread keeps its own pace)
+        use_clock(FixedClock(FPS))
+    elif controls is not None or record is not None:
+        use_clock(FixedClock(FPS, realtime=True))
+    else:
+        use_clock(pygame.time.Clock())
+
+    if renderer is None and not headless:
+        renderer = (DirtyRenderer if DIRTY_RECTS else FullRenderer)(screen, background)
+
+    play = (ThreadedPlayScene if threaded else PlayScene)(headless, max_ticks, renderer, seed, controls or read_keyboard,
+                     record, profiler, governor, state, checkpoint)
+    if headless:
+        run_scenes(play)
+        if profiler:
+            profiler.close()
+        return play.result
+
+    # Title -> play -> level / game over -> play ... until the window is closed
+    run_scenes(TitleScene(play))
+    if profiler:
+        profiler.close()
+
     # Clean up
     pygame.quit()
 
+def replay(recording, headless=True, renderer=None):
+    """Play a Recording back; headless replays run as fast as possible"""
+    return main(headless=headless, max_ticks=len(recording.inputs), renderer=renderer,
+                seed=recording.seed, controls=recording.controls())
+
+def sibling(name):
+    """Import game/<name>.py the same way this module was imported (see the imports at the top)"""
+    return importlib.import_module(f".{name}", __package__) if __package__ else importlib.import_module(name)
+
+def swarm_engine(count, level=1, seed=None):
+    """A swarm.SwarmEngine of `count` aliens with this game's images, screen size and clock"""
+    SwarmEngine = sibling("swarm").SwarmEngine  # Only the swarm mode needs NumPy
+    init()
+    images = {"alien": assets.get("alien", (50, 50)), "bullet": assets.get("bullet", (10, 20)),
+              "enemy_bullet": assets.get("bullet", (8, 16), 180)}
+    # Looked up on every call, since use_clock() can swap get_ticks for another clock's
+    return SwarmEngine(images, (WIDTH, HEIGHT), lambda: get_ticks(), count, level, seed)
+
+def run_swarm(count, headless=HEADLESS, max_ticks=None, renderer=None, seed=None):
+    """Stress mode: `count` aliens on the SwarmEngine.
+
+    Arrow keys move the player, who fires a triple shot every 100 ms. Runs
+    until the window is closed (or max_ticks) and returns a summary dict.
+    """
+    init(headless)
+    use_clock(FixedClock(FPS) if headless else pygame.time.Clock())
+    if renderer is None and not headless:
+        renderer = FullRenderer(screen, background)
+
+    SwarmView = sibling("swarm").SwarmView
+    engine = swarm_engine(count, seed=seed)
+    view = SwarmView(engine)
+    player = Player()
+    rammed = 0
+    ticks = 0
+    last_shot = get_ticks()
+    running = True
+    start = time.perf_counter()
+
+    while running:
+        if max_ticks is not None and ticks >= max_ticks:
+            break
+        clock.tick(FPS)
+        ticks += 1
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        player.input = read_keyboard(())
+        player.update()
+        now = get_ticks()
+        if now - last_shot > 100:
+            last_shot = now
+            for offset in [-10, 0, 10]:
+                engine.fire(player.rect.centerx + offset, player.rect.top)
+
+        engine.step()
+        engine.collide()
+        engine.hits(engine.enemy_bullets, player.rect)
+        hits = engine.hits(engine.aliens, player.rect)
+        if len(hits):
+            rammed += len(hits)
+            engine.spawn_aliens(len(hits), hits)
+
+        if renderer is not None:
+            frame = DrawList()
+            view.draw(frame)
+            frame.blit(player.image, player.rect)
+            draw_text(frame, f"Aliens: {len(engine.aliens)}  FPS: {clock.get_fps():.0f}", 24, WIDTH // 2, 10)
+            renderer.present(frame)
+
+    elapsed = time.perf_counter() - start
+    if not headless:
+        pygame.quit()
+    return {"aliens": count, "ticks": ticks, "score": engine.score, "rammed": rammed,
+            "ticks_per_s": round(ticks / elapsed) if elapsed else None}
+
+def option(argv, name, default=None, kind=int):
+    """Read the value of a `--name VALUE` command line option"""
+    if name in argv:
+        return kind(argv[argv.index(name) + 1])
+    return default
+
 # Start the game
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--build-bundle" in sys.argv:
+        # Always from the PNGs, never from an older bundle
+        USE_BUNDLE = False
+        init(sound=True)
+        size = AssetBundle.build(assets, loaded_sounds)
+        print(f"{BUNDLE_PATH}: {len(assets.surfaces)} surfaces, {len(loaded_sounds)} sounds, {size // 1024} KB")
+    elif "--profile-startup" in sys.argv:
+        profiler = profile_startup(option(sys.argv, "--trace", kind=str))
+        for step, stat in profiler.stats().items():
+            print(f"{'total' if step == 'frame' else step:<16}{stat['max']:>8.2f} ms")
+        print(f"images from: {'bundle' if bundle else 'PNG files'}")
+        if missing_files:
+            print(f"stand-ins for missing files: {', '.join(missing_files)}")
+    elif "--swarm" in sys.argv:
+        print(run_swarm(option(sys.argv, "--swarm"), max_ticks=option(sys.argv, "--ticks",
+                                                                      FPS * 60 if HEADLESS else None)))
+    elif "--replay" in sys.argv:
+        start = time.perf_counter()
+        result = replay(Recording.load(option(sys.argv, "--replay", kind=str)), headless=HEADLESS)
+        elapsed = time.perf_counter() - start
+        if result:
+            print(f"{result} in {elapsed:.2f}s ({result['ticks'] / elapsed:.0f} ticks/s)")
+    else:
+        recording = Recording() if "--record" in sys.argv else None
+        seed = option(sys.argv, "--seed")
+        state = None
+        if "--load-state" in sys.argv:
+            with open(option(sys.argv, "--load-state", kind=str), "rb") as f:
+                state = f.read()
+        checkpoint = option(sys.argv, "--checkpoint", kind=str)
+        profiler = None
+        if "--profile" in sys.argv or "--trace" in sys.argv:
+            profiler = FrameProfiler(trace_path=option(sys.argv, "--trace", kind=str))
+        if HEADLESS:
+            # Default to one hour of game time
+            start = time.perf_counter()
+            result = main(headless=True, max_ticks=option(sys.argv, "--ticks", FPS * 60 * 60),
+                          seed=seed, record=recording, profiler=profiler, state=state,
+                          checkpoint=checkpoint)
+            elapsed = time.perf_counter() - start
+            print(f"{result} in {elapsed:.2f}s ({result['ticks'] / elapsed:.0f} ticks/s)")
+        else:
+            governor = None
+            if "--no-governor" not in sys.argv:
+                governor = QualityGovernor(option(sys.argv, "--frame-budget", 1000 / FPS, float))
+            main(seed=seed, record=recording, profiler=profiler, governor=governor, state=state,
+                 checkpoint=checkpoint)
+        if recording is not None:
+            recording.save(option(sys.argv, "--record", kind=str))
+        if profiler:
+            print("\n".join(profiler.report_lines()))
+            print(f"text cache: {text_cache.stats()}")
\ No newline at end of file
@@ -0,0 +1,918 @@
+"""Benchmarks for army.py.
+
+Run from the repository root, e.g.:
+
+    python game/bench.py collision
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+
+# Benchmarks never need a window or sound
+os.environ["ARMY_HEADLESS"] = "1"
+import pygame
+import army
+
+
+def make_sprites(count, size, area, rng):
+    """Plain sprites with random rects spread over area (width, height)"""
+    sprites = []
+    for _ in range(count):
+        sprite = pygame.sprite.Sprite()
+        sprite.rect = pygame.Rect(rng.randrange(area[0]), rng.randrange(area[1]), *size)
+        sprites.append(sprite)
+    return sprites
+
+
+def time_call(func, repeat):
+    """Best wall time of func() over repeat runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_collision(args):
+    """Compare pygame's groupcollide with the spatial-hash version.
+
+    The arena grows with the entity count so the density stays at about 100
+    entities per 800x600 screen, like a busy late-game frame.
+    """
+    rng = random.Random(args.seed)
+    print(f"{'entities':>9} {'pygame ms':>10} {'hashed ms':>10} {'speedup':>8}  same")
+    for count in args.counts:
+        scale = max(1.0, (count / 100) ** 0.5)
+        area = (int(army.WIDTH * scale), int(army.HEIGHT * scale))
+        aliens = make_sprites(count // 2, (50, 50), area, rng)
+        bullets = make_sprites(count - count // 2, (10, 20), area, rng)
+
+        plain_a, plain_b = pygame.sprite.Group(aliens), pygame.sprite.Group(bullets)
+        hashed_a, hashed_b = army.HashedGroup(aliens), army.HashedGroup(bullets)
+
+        # Results must match exactly, including order (no kills so both can be reused)
+        expected = pygame.sprite.groupcollide(plain_a, plain_b, False, False)
+        got = army.groupcollide(hashed_a, hashed_b, False, False)
+        same = list(expected.items()) == list(got.items())
+
+        repeat = args.repeat if count <= 2000 else 1
+        plain_ms = time_call(lambda: pygame.sprite.groupcollide(plain_a, plain_b, False, False), repeat)
+        hashed_ms = time_call(lambda: army.groupcollide(hashed_a, hashed_b, False, False), repeat)
+        print(f"{count:>9} {plain_ms:>10.3f} {hashed_ms:>10.3f} {plain_ms / hashed_ms:>7.1f}x  {same}")
+
+
+def image_sprites(count, image, area, rng, solid=False):
+    """make_sprites() with an image, for mask collisions"""
+    sprites = make_sprites(count, image.get_size(), area, rng)
+    for sprite in sprites:
+        sprite.image = image
+        sprite.solid = solid
+    return sprites
+
+
+def bench_masks(args):
+    """Rect-only hits vs cached masks behind the grid vs pygame's collide_mask.
+
+    Aliens and bullets are packed into one screen, far denser than the game
+    ever gets, so many rects overlap and the masks have work to do.
+    """
+    rng = random.Random(args.seed)
+    alien = army.assets.get("alien", (50, 50))
+    bullet = army.assets.get("bullet", (10, 20))
+    area = (army.WIDTH, army.HEIGHT)
+    print(f"{'entities':>9} {'rect ms':>8} {'mask ms':>8} {'us/pair':>8} {'collide_mask ms':>16} "
+          f"{'rect hits':>10} {'pixel hits':>11}")
+    for count in args.counts:
+        aliens = army.HashedGroup(image_sprites(count // 2, alien, area, rng))
+        bullets = army.HashedGroup(image_sprites(count - count // 2, bullet, area, rng, solid=True))
+
+        def hits(pixels):
+            army.PIXEL_HITS = pixels
+            return army.groupcollide(aliens, bullets, False, False)
+        rect_hits, pixel_hits = hits(False), hits(True)  # The second one builds the masks
+        rect_ms = time_call(lambda: hits(False), args.repeat)
+        mask_ms = time_call(lambda: hits(True), args.repeat)
+        army.PIXEL_HITS = False
+        # pygame's own: no broadphase, and a new mask for both sprites of every pair
+        plain = time_call(lambda: pygame.sprite.groupcollide(aliens, bullets, False, False,
+                                                             pygame.sprite.collide_mask), 1)
+        pairs = sum(map(len, rect_hits.values()))
+        # us/pair: what the mask test adds for each pair of overlapping rects
+        print(f"{count:>9} {rect_ms:>8.3f} {mask_ms:>8.3f} {1000 * (mask_ms - rect_ms) / max(1, pairs):>8.2f} "
+              f"{plain:>16.1f} {pairs:>10} {sum(map(len, pixel_hits.values())):>11}")
+
+
+def check_swarm_collide(rng, count):
+    """Engine collisions must kill the same aliens/bullets as groupcollide"""
+    engine = army.swarm_engine(count, seed=rng.randrange(1 << 30))
+    engine.aliens.y[:] = [rng.randrange(army.HEIGHT) for _ in range(len(engine.aliens.y))]
+    for _ in range(count):
+        engine.fire(rng.randrange(army.WIDTH), rng.randrange(army.HEIGHT))
+    aliens = pygame.sprite.Group(box_sprite(engine.aliens, slot) for slot in engine.aliens.live())
+    bullets = pygame.sprite.Group(box_sprite(engine.bullets, slot) for slot in engine.bullets.live())
+    hits = pygame.sprite.groupcollide(aliens, bullets, True, True)
+    engine.collide(respawn=False)
+    return (len(aliens) == len(engine.aliens) and len(bullets) == len(engine.bullets)
+            and all(not engine.aliens.alive[alien.slot] for alien in hits))
+
+
+def box_sprite(arrays, slot):
+    sprite = pygame.sprite.Sprite()
+    sprite.rect = pygame.Rect(int(arrays.x[slot]), int(arrays.y[slot]), arrays.width, arrays.height)
+    sprite.slot = slot
+    return sprite
+
+
+def bench_swarm(args):
+    """Per-tick cost of sprite aliens vs the NumPy SwarmEngine.
+
+    Each tick moves everything, collides player bullets with aliens
+    (respawning the dead) and tops the bullets back up.
+    """
+    rng = random.Random(args.seed)
+    same = all(check_swarm_collide(rng, count) for count in (10, 100, 1000))
+    print(f"engine collisions match groupcollide: {same}")
+
+    army.clock = army.FixedClock()
+    army.get_ticks = army.clock.get_ticks
+    print(f"{'aliens':>8} {'sprites ms':>11} {'engine ms':>10} {'speedup':>8}")
+    for count in args.counts:
+        army.all_sprites = pygame.sprite.Group()
+        army.aliens, army.bullets = army.HashedGroup(), army.HashedGroup()
+        army.spawn_enemies(count, 1)
+
+        def sprite_tick():
+            army.clock.tick()
+            army.all_sprites.update()
+            army.aliens.refresh()
+            army.bullets.refresh()
+            for _ in army.groupcollide(army.aliens, army.bullets, True, True):
+                army.spawn_enemies(1, 1)
+            while len(army.bullets) < count:
+                bullet = army.bullet_pool.acquire(rng.randrange(army.WIDTH), rng.randrange(army.HEIGHT))
+                army.bullets.add(bullet)
+                army.all_sprites.add(bullet)
+
+        engine = army.swarm_engine(count, seed=args.seed)
+
+        def engine_tick():
+            army.clock.tick()
+            engine.step()
+            engine.collide()
+            missing = count - len(engine.bullets)
+            if missing > 0:
+                engine.bullets.spawn(missing, x=engine.rng.integers(0, army.WIDTH, missing),
+                                     y=engine.rng.integers(0, army.HEIGHT, missing), speed=-10)
+
+        ticks = args.ticks if count <= 2000 else max(1, args.ticks // 10)
+        sprite_ms = time_call(lambda: [sprite_tick() for _ in range(ticks)], 1) / ticks
+        engine_ms = time_call(lambda: [engine_tick() for _ in range(ticks)], 1) / ticks
+        print(f"{count:>8} {sprite_ms:>11.3f} {engine_ms:>10.3f} {sprite_ms / engine_ms:>7.1f}x")
+        for sprite in army.all_sprites.sprites():
+            sprite.kill()
+
+
+class CompareRenderer:
+    """Renders every frame with both renderers and compares the results"""
+    def __init__(self, shoot_every):
+        self.full = army.FullRenderer(army.screen.copy(), army.background, display=False)
+        self.dirty = army.DirtyRenderer(army.screen.copy(), army.background, display=False)
+        self.shoot_every = shoot_every
+        self.frames = 0
+        self.mismatches = 0
+        self.area = 0
+
+    def invalidate(self):
+        self.full.invalidate()
+        self.dirty.invalidate()
+
+    def present(self, frame, lap=army.no_lap):
+        self.full.present(frame, lap)
+        self.dirty.present(frame)
+        self.frames += 1
+        self.area += self.dirty.last_area
+        if frame_hash(self.full.target) != frame_hash(self.dirty.target):
+            self.mismatches += 1
+        # Keep the player shooting so bullets and explosions show up
+        if self.frames % self.shoot_every == 0:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+
+
+def frame_hash(surface):
+    return hashlib.sha1(pygame.image.tobytes(surface, "RGB")).hexdigest()
+
+
+def check_dirty(args):
+    """Check that dirty-rect rendering is pixel-identical to full redraws"""
+    renderer = CompareRenderer(args.shoot_every)
+    result = army.main(headless=True, max_ticks=args.ticks, renderer=renderer, seed=args.seed)
+    screen_area = army.WIDTH * army.HEIGHT * max(1, renderer.frames)
+    print(f"{renderer.frames} frames, {renderer.mismatches} mismatched, "
+          f"{100 * renderer.area / screen_area:.1f}% of the screen repainted on average "
+          f"(score {result['score']})")
+    if renderer.mismatches:
+        sys.exit(1)
+
+
+def bot_controls(seed):
+    """Scripted input: wanders left and right and shoots whenever it can"""
+    bot = random.Random(seed)
+    state = {"move": army.LEFT, "hold": 0}
+
+    def controls(events):
+        if state["hold"] == 0:
+            state["move"] = bot.choice([army.LEFT, army.RIGHT, 0, army.UP, army.DOWN])
+            state["hold"] = bot.randrange(5, 60)
+        state["hold"] -= 1
+        return state["move"] | (army.SHOOT if bot.random() < 0.2 else 0)
+    return controls
+
+
+def check_replay(args):
+    """Record a bot-driven headless run, replay it from the file and compare"""
+    recording = army.Recording()
+    start = time.perf_counter()
+    recorded = army.main(headless=True, max_ticks=args.ticks, seed=args.seed,
+                         controls=bot_controls(args.seed), record=recording)
+    record_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.rec")
+        recording.save(path)
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        replayed = army.replay(army.Recording.load(path))
+        replay_s = time.perf_counter() - start
+
+    keys = ("score", "level", "ticks", "game_over", "checksum")
+    same = all(recorded[key] == replayed[key] for key in keys)
+    game_s = recorded["ticks"] / army.FPS
+    print(f"recorded {recorded['ticks']} ticks ({game_s:.0f}s of play, score {recorded['score']}, "
+          f"level {recorded['level']}) into {size} bytes")
+    print(f"record {record_s:.2f}s, replay {replay_s:.2f}s ({game_s / replay_s:.0f}x real time), "
+          f"identical: {same}")
+    if not same:
+        print({key: (recorded[key], replayed[key]) for key in keys})
+        sys.exit(1)
+
+
+class SoakPlay(army.PlayScene):
+    """Headless play scene that restarts through the scene machine when its run ends"""
+    restarts = 0
+    every = 1000
+    restarts_left = 0
+    samples = []
+
+    def finish(self):
+        super().finish()
+        self.world.release()
+        if SoakPlay.restarts % SoakPlay.every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            depth = len(traceback.extract_stack())
+            SoakPlay.samples.append((SoakPlay.restarts, current, rss_kb(), depth))
+        if SoakPlay.restarts == SoakPlay.restarts_left:
+            return None
+        SoakPlay.restarts += 1
+        return self.restart()
+
+
+def soak_restarts(args):
+    """Restart the game many times and watch memory and stack depth"""
+    SoakPlay.restarts_left = args.restarts
+    SoakPlay.every = args.every
+    army.use_clock(army.FixedClock())
+    tracemalloc.start()
+    start = time.perf_counter()
+    scenes = army.run_scenes(SoakPlay(headless=True, max_ticks=args.ticks, seed=args.seed,
+                                      controls=bot_controls(args.seed)))
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    print(f"{args.restarts} restarts ({scenes} scenes) in {elapsed:.1f}s")
+    print(f"{'restarts':>9} {'traced KB':>10} {'RSS KB':>9} {'stack':>6}")
+    for done, current, rss, depth in SoakPlay.samples:
+        print(f"{done:>9} {current / 1024:>10.0f} {rss:>9} {depth:>6}")
+
+
+def rss_kb():
+    """Resident set size of this process (Linux), in KB"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def peak_rss_kb():
+    """Most memory this process has had resident (Linux), in KB"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+
+
+# Stress scenarios: each one sets up a World and returns (controls, hook), where
+# hook(world, tick) runs before every tick. The player can't die in any of them,
+# so every scenario runs for all of its ticks.
+def idle_wave(world):
+    """Level 1 as it starts, with nobody at the controls"""
+    return (lambda events: 0), None
+
+
+def rapid_fire(world):
+    """Rapid fire that never runs out, sweeping left and right through a level 5 wave"""
+    world.level = 5
+    army.spawn_enemies(40, 5)
+    player = world.player
+    player.activate_rapid_fire()
+
+    def hook(world, tick):
+        player.rapid_fire_time = army.get_ticks()
+    # Two seconds each way
+    return (lambda events: army.SHOOT | (army.LEFT if army.get_ticks() // 2000 % 2 else army.RIGHT)), hook
+
+
+def bomb_clear(world):
+    """A bomb on the player every second, clearing 200 aliens in a wall of explosions"""
+    army.spawn_enemies(200, 1)
+
+    def hook(world, tick):
+        if tick % army.FPS == 0:
+            power = army.powerup_pool.acquire(world.player.rect.center)
+            power.type = "bomb"
+            power.image = army.assets.get("bomb", (30, 30))
+            world.all_sprites.add(power)
+            world.powerups.add(power)
+        if len(world.aliens) < 200:
+            army.spawn_enemies(200 - len(world.aliens), 1)
+    return (lambda events: 0), hook
+
+
+def boss_30(world):
+    """The level 30 boss's spread fire, dodged but never shot back"""
+    for alien in world.aliens.sprites():
+        alien.kill()
+    world.level = 30
+    world.boss_level = True
+    world.boss = army.Boss(world.level // 3)
+    world.all_sprites.add(world.boss)
+    return bot_controls(1), None
+
+
+def alien_horde(count):
+    def scenario(world):
+        army.spawn_enemies(count, 3)  # Level 3, so some of them shoot
+        return bot_controls(1), None
+    scenario.__doc__ = f"{count} aliens from spawn_enemies, a third of them shooting"
+    return scenario
+
+
+SCENARIOS = {"idle_wave": idle_wave, "rapid_fire": rapid_fire, "bomb_clear": bomb_clear,
+             "boss_30": boss_30, "aliens_1k": alien_horde(1000), "aliens_10k": alien_horde(10000)}
+
+
+def run_scenario(args):
+    """One scenario in this process; prints its numbers as a line of JSON"""
+    army.use_clock(army.FixedClock())
+    army.rng.seed(args.seed)
+    world = army.World()
+    world.player.get_hit = lambda damage: False
+    controls, hook = SCENARIOS[args.name](world)
+    renderer = None if args.no_render else army.FullRenderer(army.screen.copy(), army.background, display=False)
+
+    def tick(number):
+        if hook:
+            hook(world, number)
+        army.clock.tick()
+        world.step(controls(()))
+        army.audio.flush()
+        if renderer:
+            frame = army.DrawList()
+            world.draw(frame)
+            renderer.present(frame)
+
+    times = []
+    blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    for number in range(args.ticks):
+        tick_start = time.perf_counter()
+        tick(number)
+        times.append((time.perf_counter() - tick_start) * 1000)
+    elapsed = time.perf_counter() - start
+    blocks = sys.getallocatedblocks() - blocks
+
+    # Memory allocated and freed again inside a tick, sampled with tracemalloc
+    # afterwards since it slows everything down
+    tracemalloc.start()
+    churn = []
+    for number in range(args.ticks, args.ticks + args.alloc_ticks):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        tick(number)
+        churn.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    times.sort()
+    print(json.dumps({
+        "ticks": args.ticks, "sprites": len(world.all_sprites),
+        "ticks_per_s": round(args.ticks / elapsed, 1),
+        "p50_ms": round(times[len(times) // 2], 3),
+        "p95_ms": round(times[len(times) * 95 // 100], 3),
+        "p99_ms": round(times[len(times) * 99 // 100], 3),
+        "max_ms": round(times[-1], 3),
+        "alloc_kb_per_tick": round(sum(churn) / len(churn) / 1024, 1) if churn else None,
+        "blocks_per_tick": round(blocks / args.ticks, 2),
+        "peak_rss_kb": peak_rss_kb(),
+    }))
+
+
+# Higher is better for ticks_per_s; lower for the rest
+WATCHED = {"ticks_per_s": 1, "p95_ms": -1, "peak_rss_kb": -1}
+
+
+def bench_scenarios(args):
+    """Every scenario in a fresh interpreter (so peak RSS is its own), compared with a baseline"""
+    results = {}
+    for name in args.only or SCENARIOS:
+        command = [sys.executable, os.path.abspath(__file__), "scenario", name,
+                   "--ticks", str(args.ticks), "--seed", str(args.seed)]
+        if args.no_render:
+            command.append("--no-render")
+        out = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        results[name] = json.loads(out.splitlines()[-1])
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["scenarios"]
+    print(f"{'scenario':<12}{'sprites':>8}{'ticks/s':>9}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}"
+          f"{'KB/tick':>9}{'blocks':>8}{'RSS MB':>8}  vs baseline")
+    regressions = []
+    for name, r in results.items():
+        notes = []
+        for key, sign in WATCHED.items():
+            old = baseline.get(name, {}).get(key)
+            if old:
+                change = (r[key] - old) / old
+                if change * sign < -args.tolerance:
+                    notes.append(f"{key} {change:+.0%}")
+        if notes:
+            regressions.append(name)
+        status = ", ".join(notes) or ("ok" if name in baseline else "-")
+        print(f"{name:<12}{r['sprites']:>8}{r['ticks_per_s']:>9.0f}{r['p50_ms']:>8.2f}{r['p95_ms']:>8.2f}"
+              f"{r['p99_ms']:>8.2f}{r['alloc_kb_per_tick']:>9.1f}{r['blocks_per_tick']:>8.1f}"
+              f"{r['peak_rss_kb'] / 1024:>8.1f}  {status}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "pygame": pygame.version.ver,
+                       "ticks": args.ticks, "render": not args.no_render, "scenarios": results}, f, indent=2)
+    if regressions:
+        print(f"regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+class Shooter:
+    """Stand-in for a sprite with a shot cooldown, timed either way"""
+    def __init__(self, delay):
+        self.delay = delay
+        self.last_shot = army.get_ticks()
+        self.shots = 0
+
+    def poll(self):
+        now = army.get_ticks()
+        if now - self.last_shot > self.delay:
+            self.last_shot = now
+            self.shots += 1
+
+    def shoot_tick(self):
+        self.shots += 1
+        army.timers.call_after(self.delay, self.shoot_tick)
+
+
+def bench_timers(args):
+    """Per-tick cost of cooldowns: polling every sprite vs the Scheduler"""
+    print(f"{'timers':>8} {'polling us':>11} {'scheduler us':>13} {'fired/tick':>11} {'speedup':>8}")
+    for count in args.counts:
+        rng = random.Random(args.seed)
+        delays = [rng.randint(1000, 3000) for _ in range(count)]
+
+        army.use_clock(army.FixedClock())
+        polled = [Shooter(delay) for delay in delays]
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            army.clock.tick()
+            for shooter in polled:
+                shooter.poll()
+        polling = time.perf_counter() - start
+
+        army.use_clock(army.FixedClock())
+        army.timers = army.Scheduler()
+        scheduled = [Shooter(delay) for delay in delays]
+        for shooter in scheduled:
+            army.timers.call_after(shooter.delay, shooter.shoot_tick)
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            army.clock.tick()
+            army.timers.run()
+        scheduler = time.perf_counter() - start
+
+        assert [s.shots for s in polled] == [s.shots for s in scheduled]
+        print(f"{count:>8} {polling * 1e6 / args.ticks:>11.1f} {scheduler * 1e6 / args.ticks:>13.1f} "
+              f"{army.timers.fired / args.ticks:>11.2f} {polling / scheduler:>7.1f}x")
+
+
+def bot_world(seed, level, ticks):
+    """A World started at `level` and played by the bot for `ticks` ticks"""
+    army.use_clock(army.FixedClock())
+    army.rng.seed(seed)
+    world = army.World(spawn=False)
+    world.level = level
+    if level % 3:
+        army.spawn_enemies(6 + level, level)
+    controls = bot_controls(seed)
+    play_ticks(world, controls, ticks)
+    return world, controls
+
+
+def play_ticks(world, controls, ticks):
+    for _ in range(ticks):
+        army.clock.tick()
+        world.step(controls if isinstance(controls, int) else controls(()))
+        army.audio.flush()
+
+
+def median_us(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[repeat // 2] * 1e6
+
+
+def bench_savestate(args):
+    """SaveState size and speed at a few points of a game, and a fork that has to match"""
+    # loads includes handing the sprites back to their pools afterwards
+    print(f"{'level':>6} {'sprites':>8} {'timers':>7} {'bytes':>6} {'dumps us':>9} {'loads us':>9} {'fork':>5}")
+    failed = False
+    for level in args.levels:
+        world, controls = bot_world(args.seed, level, args.warmup)
+        data = army.SaveState.dumps(world)
+        sprites, timers = len(world.all_sprites), len(world.timers)
+        dumps = median_us(lambda: army.SaveState.dumps(world), args.repeat)
+
+        # Play on, then go back to the save and play the same inputs again
+        inputs = [controls(()) for _ in range(args.ticks)]
+        for keys in inputs:
+            play_ticks(world, keys, 1)
+        played = world.checksum()
+        world.release()
+        loads = median_us(lambda: army.SaveState.loads(data).release(), args.repeat)
+        world = army.SaveState.loads(data)
+        same = army.SaveState.dumps(world) == data
+        for keys in inputs:
+            play_ticks(world, keys, 1)
+        same = same and world.checksum() == played
+        world.release()
+        failed = failed or not same
+        print(f"{level:>6} {sprites:>8} {timers:>7} {len(data):>6} {dumps:>9.1f} {loads:>9.1f} "
+              f"{'same' if same else 'DIFF':>5}")
+    if failed:
+        sys.exit(1)
+
+
+def bench_env(args):
+    """Steps per second of ArmyEnv and of VectorEnv over a few worker counts"""
+    import env
+    actions = random.Random(args.seed)
+    for observation in ("entities", "frame"):
+        single = env.ArmyEnv(observation)
+        single.reset(seed=args.seed)
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            _, _, terminated, truncated, _ = single.step(actions.randrange(env.ACTIONS))
+            if terminated or truncated:
+                single.reset()
+        print(f"ArmyEnv {observation}: {args.steps / (time.perf_counter() - start):.0f} steps/s")
+        single.close()
+
+    # Env 0 of the VectorEnv has to play exactly like a single env with the same seed
+    plan = [[actions.randrange(env.ACTIONS) for _ in range(args.envs)] for _ in range(args.steps // args.envs)]
+    single = env.ArmyEnv()
+    single.reset(seed=args.seed)
+    expected = [single.step(step[0])[1] for step in plan]
+    single.close()
+    print(f"{'workers':>8} {'envs':>5} {'steps/s':>9} {'episodes':>9} {'env 0 matches':>14}")
+    for workers in args.workers:
+        with env.VectorEnv(args.envs, workers) as envs:
+            envs.reset(seed=args.seed)
+            rewards = []
+            episodes = 0
+            start = time.perf_counter()
+            for step in plan:
+                _, reward, _, _, ended = envs.step(step)
+                rewards.append(float(reward[0]))
+                episodes += len(ended)
+            elapsed = time.perf_counter() - start
+        print(f"{workers:>8} {args.envs:>5} {len(plan) * args.envs / elapsed:>9.0f} {episodes:>9} "
+              f"{str(rewards == expected):>14}")
+
+
+def bench_governor(args):
+    """A rendered bot game with and without the QualityGovernor, on a tight budget"""
+    results = {}
+    for name, governor in (("off", None), ("on", army.QualityGovernor(args.budget))):
+        profiler = army.FrameProfiler(window=args.ticks)
+        renderer = army.FullRenderer(army.screen.copy(), army.background, display=False)
+        print(f"governor {name}:")
+        # The pools outlive a run, and a headless run leaves its sprites alive at the end,
+        # so count the explosions above what the last run left behind
+        army.reset_pool_stats()
+        leftover = army.explosion_pool.live
+        result = army.main(headless=True, max_ticks=args.ticks, seed=args.seed, renderer=renderer,
+                           controls=bot_controls(args.seed), profiler=profiler, governor=governor)
+        results[name] = (profiler.stats()["frame"], result["checksum"],
+                         result["pools"]["Explosion"]["high_water"] - leftover, governor)
+
+    print(f"budget {args.budget} ms, {args.ticks} ticks")
+    print(f"{'governor':<9}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'explosions':>12}{'changes':>9}")
+    for name, (frame, checksum, explosions, governor) in results.items():
+        changes = len(governor.log) if governor else 0
+        print(f"{name:<9}{frame['p50']:>8.3f}{frame['p95']:>8.3f}{frame['p99']:>8.3f}{explosions:>12}{changes:>9}")
+    print(f"same game either way: {results['off'][1] == results['on'][1]}")
+
+
+class CountingRenderer(army.FullRenderer):
+    """FullRenderer off screen that counts the frames and the ticks they showed"""
+    def __init__(self):
+        super().__init__(army.screen.copy(), army.background, display=False)
+        self.frames = 0
+        self.times = []
+
+    def present(self, frame, lap=army.no_lap):
+        super().present(frame, lap)
+        self.frames += 1
+        self.times.append(time.perf_counter())
+
+
+def check_threaded(args):
+    """Run a bot game on the simulation thread and check it plays out like the plain loop"""
+    plain = army.main(headless=True, max_ticks=args.ticks, seed=args.seed, controls=bot_controls(args.seed))
+    renderer = CountingRenderer()
+    start = time.perf_counter()
+    threaded = army.main(headless=True, max_ticks=args.ticks, seed=args.seed, renderer=renderer,
+                         controls=bot_controls(args.seed), threaded=True)
+    elapsed = time.perf_counter() - start
+
+    gaps = sorted(b - a for a, b in zip(renderer.times, renderer.times[1:])) or [0]
+    keys = ("score", "level", "ticks", "game_over", "checksum")
+    same = all(plain[key] == threaded[key] for key in keys)
+    print(f"{threaded['ticks']} ticks in {elapsed:.2f}s ({threaded['ticks'] / elapsed:.1f} ticks/s), "
+          f"{renderer.frames} frames ({renderer.frames / elapsed:.0f} FPS, "
+          f"{renderer.frames / max(1, threaded['ticks']):.1f} per tick)")
+    print(f"frame gap p50 {1000 * gaps[len(gaps) // 2]:.2f} ms, "
+          f"p99 {1000 * gaps[min(len(gaps) - 1, len(gaps) * 99 // 100)]:.2f} ms")
+    print(f"same game as the single-threaded loop: {same}")
+    if not same:
+        print({key: (plain[key], threaded[key]) for key in keys})
+        sys.exit(1)
+
+
+def bench_audio(args):
+    """Bursts of explosion sounds: a play() per hit vs the SoundManager"""
+    pygame.mixer.init()
+    frequency, size, channels = pygame.mixer.get_init()
+    # Half a second of silence stands in for explosion.wav
+    tone = pygame.mixer.Sound(buffer=bytes(frequency // 2 * abs(size) // 8 * channels))
+    rng = random.Random(args.seed)
+    # Hits per tick: a few now and then, and a bomb clearing the screen every second
+    hits = [rng.randrange(40, 60) if tick % 60 == 0 else int(rng.random() < 0.1)
+            for tick in range(args.ticks)]
+
+    def paced(play, flush=None):
+        """Run the ticks at 60 FPS so sounds finish like in the game; returns work ms"""
+        clock = pygame.time.Clock()
+        work = 0
+        for count in hits:
+            clock.tick(army.FPS)
+            start = time.perf_counter()
+            for _ in range(count):
+                play()
+            if flush:
+                flush()
+            work += time.perf_counter() - start
+        pygame.mixer.stop()
+        return work * 1000
+
+    calls = []
+    plain_ms = paced(lambda: calls.append(tone.play()))
+
+    backend = army.MixerBackend()
+    backend.sounds = {name: tone for name in army.SOUNDS}
+    manager = army.SoundManager(backend)
+    managed_ms = paced(lambda: manager.play("explosion"), manager.flush)
+
+    print(f"{args.ticks} ticks at {army.FPS} FPS, {sum(hits)} explosion requests")
+    print(f"play() per hit  {plain_ms * 1000 / args.ticks:>7.1f} us/tick, {len(calls)} mixer calls, "
+          f"{calls.count(None)} found no free channel")
+    print(f"SoundManager    {managed_ms * 1000 / args.ticks:>7.1f} us/tick, "
+          f"{manager.counts['played']} mixer calls")
+    print(f"manager stats: {manager.stats()}")
+
+
+def bench_text(args):
+    """HUD text per frame: font.render every time vs the TextCache"""
+    from text import TextCache
+    target = army.screen.copy()
+    rng = random.Random(args.seed)
+    frames = []
+    score = 0
+    for tick in range(args.frames):
+        if tick % 30 == 0:
+            score += 10 * rng.randrange(4)
+        frames.append((f"Score: {score}", f"Level: {tick // 600 + 1}", f"FPS: {rng.uniform(55, 62):.0f}"))
+
+    def plain():
+        for frame in frames:
+            for text in frame:
+                target.blit(army.font.render(text, True, army.WHITE), (10, 10))
+
+    def cached():
+        for frame in frames:
+            for text in frame:
+                cache.draw(target, army.font, text, army.WHITE, (10, 10))
+
+    cache = TextCache()
+    cached()  # Warm up, like a game that has been running for a while
+    render_ms = time_call(plain, args.repeat)
+    cache_ms = time_call(cached, args.repeat)
+    print(f"{args.frames} frames x 3 HUD strings")
+    print(f"font.render  {render_ms * 1000 / args.frames:>7.1f} us/frame")
+    print(f"TextCache    {cache_ms * 1000 / args.frames:>7.1f} us/frame  ({render_ms / cache_ms:.1f}x faster)")
+    cache = TextCache()
+    cached()
+    print(f"cold cache stats: {cache.stats()}")
+
+
+def bench_startup(args):
+    """Cold start in fresh interpreters: importing army, then startup from PNGs vs the bundle"""
+    game_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=game_dir, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    code = ("import time; start = time.perf_counter(); import army, pygame; "
+            "print((time.perf_counter() - start) * 1000, army.screen is None, not pygame.display.get_init())")
+    times = []
+    for _ in range(args.repeat):
+        out = subprocess.run([sys.executable, "-c", code], env=env, cwd=os.path.dirname(game_dir),
+                             capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(out[0]))
+        side_effect_free = out[1:] == ["True", "True"]
+    times.sort()
+    print(f"import army: best {times[0]:.1f} ms, median {times[len(times) // 2]:.1f} ms "
+          f"over {args.repeat} runs, no window or resources loaded: {side_effect_free}")
+
+    def army(*flags):
+        return subprocess.run([sys.executable, os.path.join(game_dir, "army.py"), "--headless", *flags],
+                              env=env, cwd=os.path.dirname(game_dir), capture_output=True, text=True,
+                              check=True).stdout
+
+    def cold_start(*flags):
+        """Best time of each --profile-startup step over args.repeat runs"""
+        best = {}
+        for _ in range(args.repeat):
+            for line in army("--profile-startup", *flags).splitlines():
+                if line.endswith(" ms"):
+                    step, ms = line[:-3].rsplit(None, 1)
+                    best[step] = min(best.get(step, float("inf")), float(ms))
+        return best
+
+    print(army("--build-bundle"), end="")
+    png = cold_start("--no-bundle")
+    bundled = cold_start()
+    print(f"cold start, best of {args.repeat}:")
+    print(f"{'step':<16}{'PNG files':>10}{'bundle':>10}  ms")
+    for step in dict.fromkeys([*bundled, *png]):
+        print(f"{step:<16}{png.get(step, 0):>10.2f}{bundled.get(step, 0):>10.2f}")
+    print(f"bundle saves {png['total'] - bundled['total']:.1f} ms "
+          f"({png['total'] / bundled['total']:.1f}x faster cold start)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    collision = sub.add_parser("collision", help="broadphase scaling, 10 to 10,000 entities")
+    collision.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    collision.add_argument("--repeat", type=int, default=5)
+    collision.add_argument("--seed", type=int, default=1)
+    collision.set_defaults(func=bench_collision)
+
+    masks = sub.add_parser("masks", help="pixel-accurate hits with cached masks vs rect-only hits")
+    masks.add_argument("--counts", type=int, nargs="+", default=[100, 300, 1000])
+    masks.add_argument("--repeat", type=int, default=20)
+    masks.add_argument("--seed", type=int, default=1)
+    masks.set_defaults(func=bench_masks)
+
+    swarm = sub.add_parser("swarm", help="sprite aliens vs the NumPy SwarmEngine")
+    swarm.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 5000, 10000])
+    swarm.add_argument("--ticks", type=int, default=60)
+    swarm.add_argument("--seed", type=int, default=1)
+    swarm.set_defaults(func=bench_swarm)
+
+    dirty = sub.add_parser("dirty-check", help="frame-hash comparison of dirty-rect and full rendering")
+    dirty.add_argument("--ticks", type=int, default=3000)
+    dirty.add_argument("--shoot-every", type=int, default=20)
+    dirty.add_argument("--seed", type=int, default=1)
+    dirty.set_defaults(func=check_dirty)
+
+    replay = sub.add_parser("replay-check", help="record a headless run and replay it bit-exactly")
+    replay.add_argument("--ticks", type=int, default=36000)
+    replay.add_argument("--seed", type=int, default=1)
+    replay.set_defaults(func=check_replay)
+
+    scenarios = sub.add_parser("scenarios", help="stress scenarios, optionally checked against a baseline")
+    scenarios.add_argument("--only", nargs="+", choices=SCENARIOS, help="run just these scenarios")
+    scenarios.add_argument("--ticks", type=int, default=300)
+    scenarios.add_argument("--no-render", action="store_true", help="time the game logic only")
+    scenarios.add_argument("--json", help="write the results here (use as a later --baseline)")
+    scenarios.add_argument("--baseline", help="results JSON to compare with")
+    scenarios.add_argument("--tolerance", type=float, default=0.2, help="allowed change, 0.2 = 20%%")
+    scenarios.add_argument("--seed", type=int, default=1)
+    scenarios.set_defaults(func=bench_scenarios)
+
+    scenario = sub.add_parser("scenario", help="run one stress scenario and print its numbers as JSON")
+    scenario.add_argument("name", choices=SCENARIOS)
+    scenario.add_argument("--ticks", type=int, default=300)
+    scenario.add_argument("--alloc-ticks", type=int, default=30, help="ticks sampled with tracemalloc")
+    scenario.add_argument("--no-render", action="store_true")
+    scenario.add_argument("--seed", type=int, default=1)
+    scenario.set_defaults(func=run_scenario)
+
+    soak = sub.add_parser("soak-restarts", help="memory and stack depth over many restarts")
+    soak.add_argument("--restarts", type=int, default=10000)
+    soak.add_argument("--ticks", type=int, default=30, help="ticks per run")
+    soak.add_argument("--every", type=int, default=1000, help="sample every N restarts")
+    soak.add_argument("--seed", type=int, default=1)
+    soak.set_defaults(func=soak_restarts)
+
+    timers = sub.add_parser("timers", help="shot cooldowns, polling vs the Scheduler")
+    timers.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    timers.add_argument("--ticks", type=int, default=600)
+    timers.add_argument("--seed", type=int, default=1)
+    timers.set_defaults(func=bench_timers)
+
+    savestate = sub.add_parser("savestate", help="SaveState dumps/loads speed and fork determinism")
+    savestate.add_argument("--levels", type=int, nargs="+", default=[1, 4, 6, 8, 29])
+    savestate.add_argument("--warmup", type=int, default=1500, help="ticks played before saving")
+    savestate.add_argument("--ticks", type=int, default=3000, help="ticks played after the save")
+    savestate.add_argument("--repeat", type=int, default=200)
+    savestate.add_argument("--seed", type=int, default=1)
+    savestate.set_defaults(func=bench_savestate)
+
+    environment = sub.add_parser("env", help="ArmyEnv and VectorEnv steps per second")
+    environment.add_argument("--steps", type=int, default=20000)
+    environment.add_argument("--envs", type=int, default=16)
+    environment.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    environment.add_argument("--seed", type=int, default=1)
+    environment.set_defaults(func=bench_env)
+
+    governor = sub.add_parser("governor", help="rendered run with and without the quality governor")
+    governor.add_argument("--budget", type=float, default=0.25, help="frame budget in ms")
+    governor.add_argument("--ticks", type=int, default=3000)
+    governor.add_argument("--seed", type=int, default=1)
+    governor.set_defaults(func=bench_governor)
+
+    threaded = sub.add_parser("threaded", help="simulation thread with interpolated rendering vs the plain loop")
+    threaded.add_argument("--ticks", type=int, default=600)
+    threaded.add_argument("--seed", type=int, default=1)
+    threaded.set_defaults(func=check_threaded)
+
+    audio = sub.add_parser("audio", help="explosion sound bursts, play() per hit vs SoundManager")
+    audio.add_argument("--ticks", type=int, default=300)
+    audio.add_argument("--seed", type=int, default=1)
+    audio.set_defaults(func=bench_audio)
+
+    text = sub.add_parser("text", help="HUD text rendering, font.render vs TextCache")
+    text.add_argument("--frames", type=int, default=3600)
+    text.add_argument("--repeat", type=int, default=5)
+    text.add_argument("--seed", type=int, default=1)
+    text.set_defaults(func=bench_text)
+
+    startup = sub.add_parser("startup", help="import time and cold start of army.py, PNGs vs asset bundle")
+    startup.add_argument("--repeat", type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    args = parser.parse_args(argv)
+    if args.func is not bench_startup:
+        army.init()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
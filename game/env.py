@@ -0,0 +1,296 @@
+"""Step/reset environment for bots playing army.py.
+
+ArmyEnv has the Gymnasium API: reset() returns (observation, info) and
+step(action) returns (observation, reward, terminated, truncated, info).
+gymnasium itself isn't needed. It never opens a window or plays sound.
+
+VectorEnv runs many ArmyEnvs in worker processes. Observations, rewards,
+done flags and actions live in one block of shared memory, so a step only
+sends a short message to each worker whatever the observations hold.
+
+    from env import VectorEnv
+    with VectorEnv(16) as envs:
+        observations = envs.reset(seed=1)
+        observations, rewards, terminated, truncated, ended = envs.step(actions)
+"""
+import multiprocessing
+import os
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+if __package__:
+    from . import army
+else:
+    import army
+
+# An action is the input bits of a tick: any mix of army.LEFT, RIGHT, UP, DOWN and SHOOT
+ACTIONS = 32
+
+# Entity observations: the player, the boss, then the nearest few of each group
+PLAYER_FIELDS = 6   # x, y, health, lives, rapid fire, shield
+BOSS_FIELDS = 4     # present, x, y, health
+MAX_ALIENS = 16     # present, x, y each
+MAX_BULLETS = 16    # Enemy bullets; present, x, y each
+MAX_POWERUPS = 4    # present, x, y, type each
+ENTITY_SIZE = PLAYER_FIELDS + BOSS_FIELDS + 3 * MAX_ALIENS + 3 * MAX_BULLETS + 4 * MAX_POWERUPS
+
+# Frame observations: the screen scaled down this many times, RGB
+FRAME_SCALE = 8
+
+
+def observation_spec(observation):
+    """(shape, dtype) of the observations of that kind"""
+    if observation == "entities":
+        return (ENTITY_SIZE,), np.float32
+    if observation == "frame":
+        return (army.HEIGHT // FRAME_SCALE, army.WIDTH // FRAME_SCALE, 3), np.uint8
+    raise ValueError(f"unknown observation kind {observation!r} (use 'entities' or 'frame')")
+
+
+class ArmyEnv:
+    """One game of army.py as a step/reset environment.
+
+    action is the input bits for a tick (0 to ACTIONS - 1) and the reward
+    is how much the score went up. An episode ends (terminated) at game
+    over, or is cut off (truncated) after max_steps steps. Each step plays
+    frame_skip ticks with the same input.
+
+    observation="entities" gives a flat float32 array of the player, the
+    boss and the nearest aliens, enemy bullets and power-ups, with positions
+    scaled to 0..1. observation="frame" gives the screen scaled down by
+    FRAME_SCALE as uint8 RGB. The observation is written into the same
+    array every step (out= picks that array), so copy it to keep it.
+
+    Every env has its own clock, RNG and World, and switches them in before
+    it runs, so several envs can share one process.
+    """
+    action_count = ACTIONS
+
+    def __init__(self, observation="entities", max_steps=army.FPS * 60 * 5, frame_skip=1, out=None):
+        army.init(headless=True)
+        self.observation = observation
+        self.observation_shape, self.observation_dtype = observation_spec(observation)
+        self.obs = np.zeros(self.observation_shape, self.observation_dtype) if out is None else out
+        self.max_steps = max_steps
+        self.frame_skip = frame_skip
+        self.clock = army.FixedClock(army.FPS)
+        self.rng = random.Random()
+        self.world = None
+        self.steps = 0
+        self.renderer = None  # Made by the first frame observation
+
+    def activate(self):
+        """Make this env's clock, RNG and World the ones army.py uses"""
+        army.use_clock(self.clock)
+        army.rng = self.rng
+        if self.world is not None:
+            self.world.activate()
+
+    def reset(self, seed=None, options=None):
+        """Start a new game; without a seed it carries on from the last game's RNG"""
+        self.close()
+        if seed is not None:
+            self.rng.seed(seed)
+        self.clock = army.FixedClock(army.FPS)
+        self.activate()
+        self.world = army.World()
+        self.steps = 0
+        self.observe()
+        return self.obs, self.info()
+
+    def step(self, action):
+        self.activate()
+        world = self.world
+        score = world.score
+        for _ in range(self.frame_skip):
+            self.clock.tick()
+            world.step(action)
+            if world.game_over:
+                break
+        army.audio.flush()
+        self.steps += 1
+        self.observe()
+        return self.obs, world.score - score, world.game_over, self.steps >= self.max_steps, self.info()
+
+    def info(self):
+        world = self.world
+        return {"score": world.score, "level": world.level, "lives": world.player.lives,
+                "health": world.player.health, "steps": self.steps}
+
+    def observe(self):
+        if self.observation == "frame":
+            self.observe_frame()
+        else:
+            self.observe_entities()
+
+    def observe_entities(self):
+        world = self.world
+        width, height = army.WIDTH, army.HEIGHT
+        player = world.player
+        px, py = player.rect.center
+        values = [px / width, py / height, player.health / 100, player.lives / 3,
+                  player.rapid_fire, player.shield]
+        boss = world.boss
+        if world.boss_level and boss.alive():
+            values += [1, boss.rect.centerx / width, boss.rect.centery / height, boss.health / boss.max_health]
+        else:
+            values += [0, 0, 0, 0]
+
+        def nearest(group, count):
+            sprites = group.sprites()
+            sprites.sort(key=lambda s: (s.rect.centerx - px) ** 2 + (s.rect.centery - py) ** 2)
+            return sprites[:count]
+
+        for group, count in ((world.aliens, MAX_ALIENS), (world.enemy_bullets, MAX_BULLETS)):
+            sprites = nearest(group, count)
+            for sprite in sprites:
+                values += [1, sprite.rect.centerx / width, sprite.rect.centery / height]
+            values += [0, 0, 0] * (count - len(sprites))
+        sprites = nearest(world.powerups, MAX_POWERUPS)
+        for sprite in sprites:
+            values += [1, sprite.rect.centerx / width, sprite.rect.centery / height,
+                       army.SaveState.POWERUP_TYPES.index(sprite.type) / 3]
+        values += [0, 0, 0, 0] * (MAX_POWERUPS - len(sprites))
+        self.obs[:] = values
+
+    def observe_frame(self):
+        if self.renderer is None:
+            self.renderer = army.FullRenderer(army.screen.copy(), army.background, display=False)
+            self.small = pygame.Surface((army.WIDTH // FRAME_SCALE, army.HEIGHT // FRAME_SCALE))
+        frame = army.DrawList()
+        self.world.draw(frame)
+        self.renderer.present(frame)
+        pygame.transform.scale(self.renderer.target, self.small.get_size(), self.small)
+        pixels = np.frombuffer(pygame.image.tobytes(self.small, "RGB"), np.uint8)
+        self.obs[:] = pixels.reshape(self.observation_shape)
+
+    def close(self):
+        """Hand the current game's sprites back to their pools"""
+        if self.world is not None:
+            self.activate()
+            self.world.release()
+            self.world = None
+
+
+def shared_arrays(buffer, n, shape, dtype):
+    """(rewards, observations, terminated, truncated, actions) for n envs, laid out in buffer"""
+    arrays = []
+    offset = 0
+    for array_shape, array_dtype in (((n,), np.float32), ((n,) + shape, dtype),
+                                     ((n,), np.bool_), ((n,), np.bool_), ((n,), np.uint8)):
+        array = np.ndarray(array_shape, array_dtype, buffer=buffer, offset=offset)
+        offset += array.nbytes
+        arrays.append(array)
+    return arrays
+
+
+def shared_size(n, shape, dtype):
+    return n * (4 + int(np.prod(shape)) * np.dtype(dtype).itemsize + 3)
+
+
+def vector_worker(pipe, name, n, start, stop, observation, options):
+    """Worker process of a VectorEnv: runs envs start to stop - 1"""
+    memory = shared_memory.SharedMemory(name=name)
+    rewards, observations, terminated, truncated, actions = shared_arrays(
+        memory.buf, n, *observation_spec(observation))
+    envs = {i: ArmyEnv(observation, out=observations[i], **options) for i in range(start, stop)}
+    try:
+        while True:
+            command, value = pipe.recv()
+            if command == "step":
+                ended = []
+                for i, env in envs.items():
+                    _, rewards[i], terminated[i], truncated[i], info = env.step(int(actions[i]))
+                    if terminated[i] or truncated[i]:
+                        info["env"] = i
+                        ended.append(info)
+                        env.reset()
+                pipe.send(ended)
+            elif command == "reset":
+                for i, env in envs.items():
+                    env.reset(seed=None if value is None else value + i)
+                pipe.send(None)
+            else:
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        for env in envs.values():
+            env.close()
+        # The arrays point into the shared memory, which can't close while they're around
+        del rewards, observations, terminated, truncated, actions, envs
+        memory.close()
+
+
+class VectorEnv:
+    """n ArmyEnvs spread over `workers` processes (one per CPU by default), stepped together.
+
+    step(actions) takes one action per env and returns arrays of the
+    observations, rewards, terminated and truncated flags, plus a list with
+    the info of every episode that ended in this step (its "env" is the
+    env's number). Those envs are reset right away like Gymnasium's vector
+    envs, so their observation is the first one of the next episode. The
+    arrays are views of the shared memory and change on the next step.
+    """
+    def __init__(self, n, workers=None, observation="entities", **options):
+        shape, dtype = observation_spec(observation)
+        self.n = n
+        self.memory = shared_memory.SharedMemory(create=True, size=shared_size(n, shape, dtype))
+        self.rewards, self.observations, self.terminated, self.truncated, self.actions = shared_arrays(
+            self.memory.buf, n, shape, dtype)
+        # fork starts workers in milliseconds; elsewhere they import this module afresh
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        workers = max(1, min(n, workers or os.cpu_count() or 1))
+        self.pipes = []
+        self.processes = []
+        for w in range(workers):
+            start, stop = n * w // workers, n * (w + 1) // workers
+            pipe, child = context.Pipe()
+            process = context.Process(target=vector_worker, daemon=True,
+                                      args=(child, self.memory.name, n, start, stop, observation, options))
+            process.start()
+            child.close()
+            self.pipes.append(pipe)
+            self.processes.append(process)
+
+    def reset(self, seed=None):
+        """Start every env over; env i gets seed + i"""
+        for pipe in self.pipes:
+            pipe.send(("reset", seed))
+        for pipe in self.pipes:
+            pipe.recv()
+        return self.observations
+
+    def step(self, actions):
+        self.actions[:] = actions
+        for pipe in self.pipes:
+            pipe.send(("step", None))
+        ended = []
+        for pipe in self.pipes:
+            ended += pipe.recv()
+        return self.observations, self.rewards, self.terminated, self.truncated, ended
+
+    def close(self):
+        if self.memory is None:
+            return
+        for pipe in self.pipes:
+            try:
+                pipe.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join()
+        del self.rewards, self.observations, self.terminated, self.truncated, self.actions
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
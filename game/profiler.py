@@ -0,0 +1,125 @@
+"""Per-frame phase timing shared by army.py and snake.py.
+
+FrameProfiler keeps p50/p95/p99 stats of each phase of a frame and can
+stream every lap to a Chrome trace-event file. Code that takes a
+lap(phase) callback (init(), the renderers, World.step()) is timed by
+passing it profiler.lap, or no_lap to time nothing.
+"""
+import threading
+import time
+from collections import deque
+
+
+def no_lap(phase):
+    pass
+
+
+class FrameProfiler:
+    """Times the phases of every frame.
+
+    The main loop calls begin() at the start of a frame and lap(phase) at the
+    end of each phase; a lap is the time since the previous one. The last
+    `window` samples of each phase are kept for p50/p95/p99 stats, and with
+    trace_path every lap is also streamed to a Chrome trace-event file
+    (open it in chrome://tracing or Perfetto).
+    """
+    def __init__(self, window=600, trace_path=None):
+        self.samples = {}           # phase -> deque of recent durations in ns
+        self.window = window
+        self.overlay = False        # Stats overlay on screen (F3 in army.py)
+        self.overlay_lines = []
+        self.frames = 0
+        self.origin = time.perf_counter_ns()
+        self.frame_start = self.last = None
+        self.tick = 0
+        self.lock = threading.Lock()  # ThreadedPlayScene records from two threads
+        self.trace = None
+        if trace_path:
+            # JSON array format; the closing bracket is optional for trace viewers,
+            # so events can be streamed and a crashed session still loads
+            self.trace = open(trace_path, "w")
+            self.trace.write("[\n")
+
+    def begin(self, tick):
+        now = time.perf_counter_ns()
+        if self.frame_start is not None:
+            self.end_frame(now)
+        self.frame_start = self.last = now
+        self.tick = tick
+
+    def lap(self, phase):
+        now = time.perf_counter_ns()
+        self.record(phase, self.last, now - self.last)
+        self.last = now
+
+    def end_frame(self, now):
+        self.record("frame", self.frame_start, now - self.frame_start)
+        self.frames += 1
+        if self.overlay and self.frames % 30 == 0:
+            self.overlay_lines = self.report_lines()
+        self.frame_start = None
+
+    def record(self, phase, start, duration, tid=None):
+        with self.lock:
+            samples = self.samples.get(phase)
+            if samples is None:
+                samples = self.samples[phase] = deque(maxlen=self.window)
+            samples.append(duration)
+            if self.trace is not None:
+                if tid is None:
+                    tid = 0 if phase == "frame" else 1
+                args = f', "args": {{"tick": {self.tick}}}' if phase == "frame" else ""
+                self.trace.write(f'{{"name": "{phase}", "ph": "X", "pid": 1, "tid": {tid}, '
+                                 f'"ts": {(start - self.origin) / 1000:.1f}, "dur": {duration / 1000:.1f}{args}}},\n')
+
+    def stats(self):
+        """{phase: {"p50", "p95", "p99", "max"}} in milliseconds over the window"""
+        result = {}
+        with self.lock:
+            copies = {phase: list(samples) for phase, samples in self.samples.items()}
+        for phase, samples in copies.items():
+            ordered = sorted(samples)
+            last = len(ordered) - 1
+            result[phase] = {name: round(ordered[int(last * q)] / 1e6, 3)
+                             for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1))}
+        return result
+
+    def report_lines(self):
+        lines = [f"{'phase':<22}{'p50':>7}{'p95':>7}{'p99':>7}  ms"]
+        for phase, stat in self.stats().items():
+            lines.append(f"{phase:<22}{stat['p50']:>7.2f}{stat['p95']:>7.2f}{stat['p99']:>7.2f}")
+        return lines
+
+    def pause(self):
+        """End the current frame, so time spent off the play screen isn't counted in it"""
+        if self.frame_start is not None:
+            self.end_frame(time.perf_counter_ns())
+
+    def close(self):
+        self.pause()
+        with self.lock:
+            if self.trace is not None:
+                self.trace.write("{}]\n")
+                self.trace.close()
+                self.trace = None
+
+
+class PhaseTimer:
+    """lap() for phases timed on a thread of their own, recorded into a FrameProfiler.
+
+    ThreadedPlayScene draws on the main thread while the worker runs the
+    profiler's frames, so drawing keeps its own start time (start()) and
+    shows up on its own row of the trace.
+    """
+    def __init__(self, profiler, tid=2):
+        self.profiler = profiler
+        self.tid = tid
+        self.last = time.perf_counter_ns()
+
+    def start(self):
+        self.last = time.perf_counter_ns()
+
+    def lap(self, phase):
+        now = time.perf_counter_ns()
+        self.profiler.record(phase, self.last, now - self.last, self.tid)
+        self.last = now
@@ -0,0 +1,41 @@
+"""Scene state machine shared by army.py and snake.py.
+
+Each screen of a game (title, play, level banner, game over) is a Scene
+whose run() returns the scene to switch to, or None to quit. run_scenes()
+just keeps calling the current scene, so restarting means building a fresh
+play scene instead of calling the game loop again from inside itself:
+nothing from the finished run stays on the stack or in memory.
+"""
+import pygame
+
+
+class Scene:
+    """One screen of a game"""
+    def run(self):
+        """Run until it's time to leave; returns the next Scene or None to quit"""
+        raise NotImplementedError
+
+
+def run_scenes(scene):
+    """Run scenes one after another until one returns None; returns how many ran"""
+    count = 0
+    while scene is not None:
+        scene = scene.run()
+        count += 1
+    return count
+
+
+def wait_for_key(keys=None, event_type=pygame.KEYDOWN, fps=60):
+    """Wait until one of `keys` (any key if None) is pressed.
+
+    Returns the key, or None if the window was closed. Uses its own clock
+    so waiting on a menu never moves game time forward.
+    """
+    clock = pygame.time.Clock()
+    while True:
+        clock.tick(fps)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return None
+            if event.type == event_type and (keys is None or event.key in keys):
+                return event.key
@@ -0,0 +1,189 @@
+"""Thousands of games of snake at once, stepped as NumPy arrays.
+
+SnakeBatch plays the rules of snake_rules.SnakeGame on n boards of cols x
+rows cells (step=1) together. Every board is a row of the same arrays, so
+a step is a few dozen array operations whatever n is, instead of n Python
+calls. Like env.ArmyEnv it has the Gymnasium API without needing
+gymnasium, batched like VectorEnv:
+
+    from snake_batch import SnakeBatch
+    boards = SnakeBatch(4096, seed=1)
+    observations, info = boards.reset()
+    observations, rewards, terminated, truncated, info = boards.step(actions)
+"""
+import numpy as np
+
+if __package__:
+    from .snake_rules import LEFT, RIGHT, UP, DOWN
+else:
+    from snake_rules import LEFT, RIGHT, UP, DOWN
+
+# What an observation cell holds
+EMPTY, BODY, HEAD, FOOD = 0, 1, 2, 3
+
+# Action -> the x and y change it asks for; 0 is no key
+ACTIONS = 5
+ACTION_DX = np.zeros(ACTIONS, np.int8)
+ACTION_DY = np.zeros(ACTIONS, np.int8)
+ACTION_DX[LEFT], ACTION_DX[RIGHT], ACTION_DY[UP], ACTION_DY[DOWN] = -1, 1, -1, 1
+
+
+class SnakeBatch:
+    """n independent boards of snake, stepped together.
+
+    action is 0 (no key) or snake_rules.LEFT, RIGHT, UP or DOWN, with the
+    same no-reversal rule as SnakeGame.turn(). The reward is 1 for eating
+    the food. An episode ends (terminated) when the snake leaves the board,
+    runs into itself or fills the board, or is cut off (truncated) after
+    max_steps steps.
+
+    The observation is an (n, rows, cols) uint8 array of EMPTY, BODY, HEAD
+    and FOOD. It's the batch's own board, updated in place cell by cell, so
+    copy it to keep it. Boards that ended are reset right away like
+    VectorEnv's, so their observation is the first one of the next
+    episode; info["score"] has the score each board had before the step's
+    reset.
+
+    Cells are numbered y * cols + x. Each board keeps its snake in a ring
+    buffer (tail at start) and its free cells in a swap-remove array with
+    the place of each cell in it, as FreeCells does, so food goes straight
+    to a random free cell however full the board is.
+    """
+    action_count = ACTIONS
+
+    def __init__(self, n, cols=30, rows=20, max_steps=1000, seed=None):
+        self.n, self.cols, self.rows, self.max_steps = n, cols, rows, max_steps
+        self.size = size = cols * rows
+        self.rng = np.random.default_rng(seed)
+        cell = np.int16 if size < 2 ** 15 else np.int32
+        self.grid = np.zeros((n, size), np.uint8)
+        self.body = np.zeros((n, size + 1), cell)   # Ring buffer of the snake's cells
+        self.free = np.zeros((n, size), cell)       # Free cells, the first nfree of each row
+        self.pos = np.zeros((n, size), cell)        # cell -> its place in free
+        self.nfree = np.zeros(n, np.int32)
+        self.start = np.zeros(n, np.int32)          # Place of the tail in body
+        self.length = np.zeros(n, np.int32)         # How long the snake is allowed to be
+        self.snake = np.zeros(n, np.int32)          # How long it is so far
+        self.x = np.zeros(n, np.int32)
+        self.y = np.zeros(n, np.int32)
+        self.dx = np.zeros(n, np.int8)
+        self.dy = np.zeros(n, np.int8)
+        self.food = np.zeros(n, np.int32)
+        self.steps = np.zeros(n, np.int32)
+        self.rows_index = np.arange(n)
+        # Flat views, so a (board, cell) pair is one index
+        self.flat_grid = self.grid.reshape(-1)
+        self.flat_body = self.body.reshape(-1)
+        self.flat_free = self.free.reshape(-1)
+        self.flat_pos = self.pos.reshape(-1)
+        self.observations = self.grid.reshape(n, rows, cols)
+        self.reset_boards(self.rows_index)
+
+    def reset(self, seed=None):
+        """Start every board over; returns (observations, info) like ArmyEnv.reset()"""
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.reset_boards(self.rows_index)
+        return self.observations, {"score": self.length - 1}
+
+    def reset_boards(self, e):
+        """Put boards e back to the start: snake in the middle, standing still, food anywhere else"""
+        size = self.size
+        middle = self.rows // 2 * self.cols + self.cols // 2
+        self.grid[e] = EMPTY
+        self.free[e] = np.arange(size)
+        self.pos[e] = np.arange(size)
+        # The snake's cell comes out of the free cells (the last one takes its place) before the food goes down
+        self.free[e, middle] = size - 1
+        self.pos[e, size - 1] = middle
+        self.nfree[e] = size - 1
+        self.grid[e, middle] = HEAD
+        self.body[e, 0] = middle
+        self.start[e] = 0
+        self.length[e] = 1
+        self.snake[e] = 1
+        self.x[e] = self.cols // 2
+        self.y[e] = self.rows // 2
+        self.dx[e] = 0
+        self.dy[e] = 0
+        self.steps[e] = 0
+        self.place_food(e)
+
+    def place_food(self, e):
+        """Food on a random free cell of boards e (which must have one)"""
+        k = self.rng.integers(0, self.nfree[e])
+        food = self.flat_free[e * self.size + k].astype(np.int64)
+        self.food[e] = food
+        self.flat_grid[e * self.size + food] = FOOD
+
+    def step(self, actions):
+        size, span = self.size, self.size + 1
+        actions = np.asarray(actions)
+        flat_grid, flat_body, flat_free, flat_pos = self.flat_grid, self.flat_body, self.flat_free, self.flat_pos
+
+        # Turn, unless that's back the way the snake is going
+        want_dx, want_dy = ACTION_DX[actions], ACTION_DY[actions]
+        turn = ((want_dx != 0) & (self.dx == 0)) | ((want_dy != 0) & (self.dy == 0))
+        self.dx = np.where(turn, want_dx, self.dx)
+        self.dy = np.where(turn, want_dy, self.dy)
+        self.x += self.dx
+        self.y += self.dy
+        self.steps += 1
+
+        # Boundary collision
+        x, y = self.x, self.y
+        inside = (x >= 0) & (x < self.cols) & (y >= 0) & (y < self.rows)
+        on_board = e = np.flatnonzero(inside)
+        head = y[e] * self.cols + x[e]
+        base = e * size
+
+        # Trim the tail once the snake is as long as it may be
+        trim = self.snake[e] >= self.length[e]
+        t = e[trim]
+        tail = flat_body[t * span + self.start[t]].astype(np.int64)
+        flat_grid[t * size + tail] = EMPTY
+        self.start[t] = (self.start[t] + 1) % span
+        self.snake[t] -= 1
+        slot = self.nfree[t]
+        flat_free[t * size + slot] = tail
+        flat_pos[t * size + tail] = slot
+        self.nfree[t] += 1
+
+        # Self-collision
+        under = flat_grid[base + head]
+        hit = (under == BODY) | (under == HEAD)
+        moved = ~hit
+        e, head, base = e[moved], head[moved], base[moved]
+
+        # The old head becomes body and the new one goes on the end
+        had = self.snake[e] > 0
+        b = e[had]
+        neck = flat_body[b * span + (self.start[b] + self.snake[b] - 1) % span].astype(np.int64)
+        flat_grid[b * size + neck] = BODY
+        flat_grid[base + head] = HEAD
+        flat_body[e * span + (self.start[e] + self.snake[e]) % span] = head
+        self.snake[e] += 1
+        # Take the head's cell out of the free cells
+        slot = flat_pos[base + head]
+        last = flat_free[base + self.nfree[e] - 1].astype(np.int64)
+        flat_free[base + slot] = last
+        flat_pos[base + last] = slot
+        self.nfree[e] -= 1
+
+        # Food collision
+        rewards = np.zeros(self.n, np.float32)
+        eat = e[head == self.food[e]]
+        self.length[eat] += 1
+        rewards[eat] = 1
+        full = self.nfree[eat] == 0
+        self.place_food(eat[~full])
+
+        terminated = ~inside
+        terminated[on_board[hit]] = True
+        terminated[eat[full]] = True
+        truncated = ~terminated & (self.steps >= self.max_steps)
+        info = {"score": self.length - 1}
+        ended = np.flatnonzero(terminated | truncated)
+        if len(ended):
+            self.reset_boards(ended)
+        return self.observations, rewards, terminated, truncated, info
@@ -0,0 +1,284 @@
+"""Benchmarks for snake.py.
+
+Run from the repository root, e.g.:
+
+    python game/snake_bench.py render
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Benchmarks never need a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+# snake.py imports the game package, so run from the repository root like it
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import snake
+from game.snake_rules import FreeCells, Body, SnakeGame
+
+
+def serpentine(size, rows=None):
+    """Cells of a size x rows grid (square by default) in an order a snake can
+    follow: along each row, back on the next"""
+    for y in range(size if rows is None else rows):
+        row = range(size) if y % 2 == 0 else range(size - 1, -1, -1)
+        for x in row:
+            yield (x, y)
+
+
+def bench_body(args):
+    """Time per tick of the old list body vs Body, for long snakes on a size x size grid"""
+    size, ticks = args.size, args.ticks
+    print(f"{size}x{size} grid, {ticks} ticks")
+    print(f"{'length':>8}{'list us':>10}{'Body us':>10}{'speedup':>9}")
+    for length in args.lengths:
+        path = serpentine(size)
+        start_cells = [next(path) for _ in range(length)]
+        moves = [next(path) for _ in range(ticks)]
+
+        # The old way: a list of [x, y] lists
+        snake_list = [list(cell) for cell in start_cells]
+        start = time.perf_counter()
+        for cell in moves:
+            snake_head = list(cell)
+            snake_list.append(snake_head)
+            if len(snake_list) > length:
+                del snake_list[0]
+            for segment in snake_list[:-1]:
+                if segment == snake_head:
+                    raise AssertionError("the serpentine path never crosses itself")
+        old = (time.perf_counter() - start) / ticks * 1e6
+
+        body = Body()
+        for cell in start_cells:
+            body.move(cell, length)
+        start = time.perf_counter()
+        for cell in moves:
+            if body.move(cell, length):
+                raise AssertionError("the serpentine path never crosses itself")
+        new = (time.perf_counter() - start) / ticks * 1e6
+        assert list(body) == [tuple(segment) for segment in snake_list]
+        print(f"{length:>8}{old:>10.2f}{new:>10.2f}{old / new:>8.0f}x")
+
+
+def bench_food(args):
+    """Time to place food by rejection sampling vs FreeCells, as a size x size grid fills up"""
+    size, placements = args.size, args.placements
+    rng = random.Random(args.seed)
+    free = FreeCells(size, size, 1)
+    order = list(free.cells)
+    rng.shuffle(order)
+    taken = set()
+    print(f"{size}x{size} grid, {placements} placements")
+    print(f"{'full':>7}{'rejection us':>14}{'tries':>8}{'FreeCells us':>14}{'take+give us':>14}")
+    for fill in args.fills:
+        while len(taken) < fill * size * size:
+            cell = order[len(taken)]
+            taken.add(cell)
+            free.take(cell)
+
+        tries = 0
+        start = time.perf_counter()
+        for _ in range(placements):
+            while True:
+                tries += 1
+                cell = (rng.randrange(size), rng.randrange(size))
+                if cell not in taken:
+                    break
+        rejection = (time.perf_counter() - start) / placements * 1e6
+
+        start = time.perf_counter()
+        for _ in range(placements):
+            cell = free.sample(rng)
+        indexed = (time.perf_counter() - start) / placements * 1e6
+        assert cell not in taken and len(free) + len(taken) == size * size
+
+        # What a moving snake costs the index: one cell taken, one given back
+        start = time.perf_counter()
+        for i in range(placements):
+            cell = free.sample(rng)
+            free.take(cell)
+            free.give(cell)
+        updates = (time.perf_counter() - start) / placements * 1e6
+        print(f"{fill:>7.1%}{rejection:>14.2f}{tries / placements:>8.0f}{indexed:>14.2f}{updates:>14.2f}")
+
+
+def draw_board_full(win, body, food, score):
+    """The old way to draw a frame: everything, every time (minus display.update())"""
+    width, height = win.get_size()
+    block_size = snake.block_size
+    win.fill(snake.WHITE)
+    for x in range(0, width, block_size):
+        pygame.draw.line(win, snake.GRAY, (x, 0), (x, height))
+    for y in range(0, height, block_size):
+        pygame.draw.line(win, snake.GRAY, (0, y), (width, y))
+    pygame.draw.ellipse(win, snake.YELLOW, [food[0], food[1], block_size, block_size])
+    for segment in body:
+        pygame.draw.rect(win, snake.DARK_GREEN, [segment[0], segment[1], block_size, block_size], border_radius=5)
+    snake.text_cache.draw(win, snake.font, f"Score: {score}", snake.BLACK, (10, 10))
+
+
+def bench_render(args):
+    """Time per frame of full redraws vs BoardRenderer, checking they draw the same pixels"""
+    snake.init()
+    block_size, ticks = snake.block_size, args.ticks
+    rng = random.Random(args.seed)
+    print(f"{'board':>9}{'length':>8}{'full ms':>9}{'dirty ms':>10}{'speedup':>9}  same")
+    for cols, rows in args.boards:
+        width, height = cols * block_size, rows * block_size
+        win = pygame.Surface((width, height)).convert()
+        for length in args.lengths:
+            if length + ticks > cols * rows:
+                continue
+            path = [(x * block_size, y * block_size) for x, y in serpentine(cols, rows)]
+            free = FreeCells(width, height, block_size)
+            body = Body(free)
+            for cell in path[:length]:
+                body.move(cell, length)
+            renderer = snake.BoardRenderer(pygame.Surface((width, height)).convert(), display=False)
+            food, score = free.sample(rng), 0
+            renderer.draw(body, food, score)
+            full = dirty = 0.0
+            same = True
+            for i, cell in enumerate(path[length:length + ticks]):
+                body.move(cell, length)
+                if i % 20 == 0:  # Food eaten now and then
+                    food, score = free.sample(rng), score + 1
+                start = time.perf_counter()
+                renderer.draw(body, food, score)
+                dirty += time.perf_counter() - start
+                start = time.perf_counter()
+                draw_board_full(win, body, food, score)
+                full += time.perf_counter() - start
+                if i % 50 == 0:
+                    same = same and pygame.image.tobytes(win, "RGB") == pygame.image.tobytes(renderer.target, "RGB")
+            print(f"{cols:>4}x{rows:<4}{length:>8}{full / ticks * 1000:>9.3f}{dirty / ticks * 1000:>10.3f}"
+                  f"{full / dirty:>8.0f}x  {same}")
+
+
+class PickCell:
+    """rng for SnakeGame that puts the food on a chosen cell, to replay another engine's food"""
+    def __init__(self):
+        self.game = None
+        self.cell = None
+
+    def randrange(self, n):
+        if self.game is None:
+            return 0  # The first food, which the caller sets itself
+        return self.game.free.index[self.cell]
+
+
+def bench_batch(args):
+    """Env-steps per second of SnakeBatch vs SnakeGame, checking board 0 plays like SnakeGame"""
+    import numpy as np
+    from game.snake_batch import SnakeBatch, ACTIONS, EMPTY, BODY, HEAD, FOOD
+
+    cols, rows, seed, check_steps = args.cols, args.rows, args.seed, args.check_steps
+
+    # SnakeGame alone, random keys
+    rng = random.Random(seed)
+    game = SnakeGame(cols, rows, 1, rng)
+    start = time.perf_counter()
+    for _ in range(check_steps):
+        direction = rng.randrange(ACTIONS)
+        if direction:
+            game.turn(direction)
+        if not game.step():
+            game = SnakeGame(cols, rows, 1, rng)
+    python_rate = check_steps / (time.perf_counter() - start)
+    print(f"{'boards':>7}{'steps/s':>14}{'vs SnakeGame':>14}")
+    print(f"{'1':>7}{python_rate:>14,.0f}{'1x':>14}")
+
+    for n in args.sizes:
+        batch = SnakeBatch(n, cols, rows, seed=seed)
+        actions = np.random.default_rng(seed).integers(0, ACTIONS, (64, n))
+        batch.step(actions[0])  # Warm up
+        start = time.perf_counter()
+        for i in range(args.steps):
+            batch.step(actions[i % 64])
+        rate = n * args.steps / (time.perf_counter() - start)
+        print(f"{n:>7}{rate:>14,.0f}{rate / python_rate:>13.0f}x")
+
+    # Board 0 of a batch against SnakeGame fed the same keys and food
+    batch = SnakeBatch(4, cols, rows, max_steps=check_steps, seed=seed)
+    actions = np.random.default_rng(seed + 1).integers(0, ACTIONS, (check_steps, 4))
+    pick = PickCell()
+
+    def new_game():
+        pick.game = None
+        game = pick.game = SnakeGame(cols, rows, 1, pick)
+        game.food = divmod(int(batch.food[0]), cols)[::-1]
+        return game
+
+    game = new_game()
+    mismatches = episodes = 0
+    for i in range(check_steps):
+        _, rewards, terminated, truncated, info = batch.step(actions[i])
+        pick.cell = divmod(int(batch.food[0]), cols)[::-1]
+        score = game.score
+        if actions[i, 0]:
+            game.turn(int(actions[i, 0]))
+        alive = game.step()
+        if terminated[0] or truncated[0]:
+            episodes += 1
+            mismatches += alive != bool(truncated[0]) or game.score != info["score"][0]
+            game = new_game()
+            continue
+        board = np.full((rows, cols), EMPTY, np.uint8)
+        for x, y in game.body:
+            board[y, x] = BODY
+        board[game.y, game.x] = HEAD
+        board[game.food[1], game.food[0]] = FOOD
+        mismatches += (not alive or rewards[0] != game.score - score
+                       or not np.array_equal(board, batch.observations[0]))
+    print(f"board 0 vs SnakeGame: {check_steps} steps, {episodes} episodes, {mismatches} mismatches")
+
+
+def board(text):
+    """'30x20' -> (30, 20)"""
+    cols, rows = text.lower().split("x")
+    return int(cols), int(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    body = sub.add_parser("body", help="old list body vs Body for long snakes")
+    body.add_argument("--size", type=int, default=1000, help="grid is size x size")
+    body.add_argument("--lengths", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    body.add_argument("--ticks", type=int, default=1000)
+    body.set_defaults(func=bench_body)
+
+    food = sub.add_parser("food", help="rejection sampling vs FreeCells as the grid fills up")
+    food.add_argument("--size", type=int, default=1000, help="grid is size x size")
+    food.add_argument("--fills", type=float, nargs="+", default=[0.5, 0.9, 0.99, 0.999])
+    food.add_argument("--placements", type=int, default=1000)
+    food.add_argument("--seed", type=int, default=1)
+    food.set_defaults(func=bench_food)
+
+    render = sub.add_parser("render", help="full redraws vs BoardRenderer, pixel-checked")
+    render.add_argument("--boards", type=board, nargs="+", default=[(30, 20), (100, 100)], help="e.g. 30x20")
+    render.add_argument("--lengths", type=int, nargs="+", default=[10, 200, 5000])
+    render.add_argument("--ticks", type=int, default=300)
+    render.add_argument("--seed", type=int, default=1)
+    render.set_defaults(func=bench_render)
+
+    batch = sub.add_parser("batch", help="SnakeBatch env-steps/s, and board 0 checked against SnakeGame")
+    batch.add_argument("--sizes", type=int, nargs="+", default=[1024, 4096, 16384], help="boards per batch")
+    batch.add_argument("--cols", type=int, default=30)
+    batch.add_argument("--rows", type=int, default=20)
+    batch.add_argument("--steps", type=int, default=300)
+    batch.add_argument("--check-steps", type=int, default=20000)
+    batch.add_argument("--seed", type=int, default=1)
+    batch.set_defaults(func=bench_batch)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
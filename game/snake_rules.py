@@ -0,0 +1,166 @@
+"""The rules of snake.py, without pygame.
+
+SnakeGame is one round: turn() takes a key press, step() moves the snake
+one tick. snake.py draws it and feeds it the keyboard; snake_batch.py
+runs the same rules on thousands of boards at once with NumPy.
+"""
+import random
+from collections import deque
+
+# Directions a key press can ask for (0 = no key)
+LEFT, RIGHT, UP, DOWN = 1, 2, 3, 4
+
+
+class FreeCells:
+    """The board cells the snake isn't on, for placing food.
+
+    cells is an array of the free cells and index maps each of them to its
+    place in it. take() fills a cell's slot with the last cell of the
+    array, so taking, freeing and picking a random free cell are all O(1)
+    however full the board is.
+    """
+    def __init__(self, board_width, board_height, step):
+        self.board_width, self.board_height, self.step = board_width, board_height, step
+        self.cells = [(x, y) for y in range(0, board_height, step) for x in range(0, board_width, step)]
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+
+    def take(self, cell):
+        i = self.index.pop(cell, None)
+        if i is None:
+            return  # Already taken, or off the board
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[i] = last
+            self.index[last] = i
+
+    def give(self, cell):
+        x, y = cell
+        if cell not in self.index and 0 <= x < self.board_width and 0 <= y < self.board_height:
+            self.index[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def sample(self, rng=random):
+        """A random free cell, or None if the board is full"""
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
+
+    def __contains__(self, cell):
+        return cell in self.index
+
+    def __len__(self):
+        return len(self.cells)
+
+
+class Body:
+    """The snake's cells, tail first and head last.
+
+    cells is a deque and occupied counts the cells by position, so moving,
+    trimming the tail and checking for self-collision take the same time
+    however long the snake is. A FreeCells passed as free is kept up to
+    date as cells are taken and left.
+    """
+    def __init__(self, free=None):
+        self.cells = deque()
+        self.occupied = {}  # (x, y) -> how many segments are on it
+        self.free = free
+        self.vacated = None  # Cell the last move left empty, if any (for BoardRenderer)
+
+    def move(self, head, length):
+        """Add head and keep the last `length` cells; True if head ran into the body"""
+        cells, occupied = self.cells, self.occupied
+        self.vacated = None
+        if len(cells) >= length:
+            tail = cells.popleft()
+            if occupied[tail] == 1:
+                del occupied[tail]
+                self.vacated = tail
+                if self.free is not None:
+                    self.free.give(tail)
+            else:
+                occupied[tail] -= 1
+        count = occupied.get(head, 0)
+        cells.append(head)
+        occupied[head] = count + 1
+        if count == 0 and self.free is not None:
+            self.free.take(head)
+        return count > 0
+
+    def __contains__(self, cell):
+        return cell in self.occupied
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __iter__(self):
+        return iter(self.cells)
+
+
+class SnakeGame:
+    """One round of snake on a board_width x board_height board of `step`-sized cells.
+
+    Positions are in the same units as the board size (pixels in snake.py,
+    cells with step=1). The snake starts in the middle, standing still, and
+    the round ends when it leaves the board, runs into itself or fills the
+    board. rng picks where the food goes.
+    """
+    def __init__(self, board_width, board_height, step=1, rng=random):
+        self.board_width, self.board_height, self.cell_size = board_width, board_height, step
+        self.rng = rng
+        self.x = board_width // 2
+        self.y = board_height // 2
+        self.x_change = 0
+        self.y_change = 0
+        self.free = FreeCells(board_width, board_height, step)
+        self.body = Body(self.free)
+        self.length = 1
+        # The snake is on its starting cell before the food goes down, so it can't land there
+        self.body.move((self.x, self.y), self.length)
+        self.food = self.free.sample(rng)
+        self.over = False
+
+    @property
+    def score(self):
+        return self.length - 1
+
+    def turn(self, direction):
+        """Head LEFT, RIGHT, UP or DOWN, unless that's back the way the snake is going"""
+        if direction == LEFT and self.x_change == 0:
+            self.x_change = -self.cell_size
+            self.y_change = 0
+        elif direction == RIGHT and self.x_change == 0:
+            self.x_change = self.cell_size
+            self.y_change = 0
+        elif direction == UP and self.y_change == 0:
+            self.y_change = -self.cell_size
+            self.x_change = 0
+        elif direction == DOWN and self.y_change == 0:
+            self.y_change = self.cell_size
+            self.x_change = 0
+
+    def step(self):
+        """Move one tick and eat the food if it's there; returns False once the round is over"""
+        if self.over:
+            return False
+        self.x += self.x_change
+        self.y += self.y_change
+        head = (self.x, self.y)
+
+        # Boundary collision
+        if not (0 <= self.x < self.board_width and 0 <= self.y < self.board_height):
+            self.over = True
+            return False
+
+        # Move, then self-collision
+        if self.body.move(head, self.length):
+            self.over = True
+            return False
+
+        # Food collision (food only goes where the snake isn't)
+        if head == self.food:
+            self.length += 1
+            self.food = self.free.sample(self.rng)
+            if self.food is None:
+                self.over = True  # The snake fills the board
+                return False
+        return True
@@ -0,0 +1,206 @@
+"""Aliens and bullets as NumPy arrays, for swarms far bigger than sprites allow.
+
+army.py --swarm N plays with a SwarmEngine of N aliens, built by
+army.swarm_engine(), and bench.py swarm times it against the sprites.
+"""
+import numpy as np
+
+
+class EntityArrays:
+    """Entities of one size stored column-wise, one NumPy array per field.
+
+    Dead slots are reused by spawn(); the arrays double in size when full.
+    """
+    def __init__(self, size, capacity, **fields):
+        self.width, self.height = size
+        self.fields = {"x": np.float32, "y": np.float32, "speed": np.float32, **fields}
+        self.alive = np.zeros(capacity, bool)
+        for name, dtype in self.fields.items():
+            setattr(self, name, np.zeros(capacity, dtype))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive))
+
+    def spawn(self, count, **values):
+        """Fill `count` free slots with the given field values; returns their indices"""
+        free = np.flatnonzero(~self.alive)
+        if len(free) < count:
+            self.grow(2 * len(self.alive) + count)
+            free = np.flatnonzero(~self.alive)
+        slots = free[:count]
+        self.alive[slots] = True
+        for name, value in values.items():
+            getattr(self, name)[slots] = value
+        return slots
+
+    def grow(self, capacity):
+        extra = capacity - len(self.alive)
+        self.alive = np.concatenate([self.alive, np.zeros(extra, bool)])
+        for name, dtype in self.fields.items():
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(extra, dtype)]))
+
+    def live(self):
+        return np.flatnonzero(self.alive)
+
+
+def overlap_pairs(ax, ay, asize, bx, by, bsize):
+    """Index pairs (i, j) where box i of set a overlaps box j of set b.
+
+    Same test as Rect.colliderect, for every pair at once. Each a-box is
+    filed under the grid cells where the top-left corner of an overlapping
+    b-box can be; each b-box then only looks at the one cell its corner is
+    in, so the work grows with the number of boxes, not boxes squared.
+    """
+    aw, ah = asize
+    bw, bh = bsize
+    cell = max(aw + bw, ah + bh)  # So each a-box is filed under at most 2x2 cells
+    left = np.floor((ax - bw) / cell).astype(np.int64)
+    top = np.floor((ay - bh) / cell).astype(np.int64)
+    keys, owners = [], []
+    for dx in (0, 1):
+        for dy in (0, 1):
+            used = ((left + dx) * cell < ax + aw) & ((top + dy) * cell < ay + ah)
+            keys.append(cell_key(left[used] + dx, top[used] + dy))
+            owners.append(np.flatnonzero(used))
+    keys = np.concatenate(keys)
+    owners = np.concatenate(owners)
+    order = np.argsort(keys, kind="stable")
+    keys, owners = keys[order], owners[order]
+
+    # Candidate pairs: every a-box filed under the cell of each b-box corner
+    corner = cell_key(np.floor(bx / cell).astype(np.int64), np.floor(by / cell).astype(np.int64))
+    start = np.searchsorted(keys, corner, "left")
+    counts = np.searchsorted(keys, corner, "right") - start
+    j = np.repeat(np.arange(len(bx)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    i = owners[np.repeat(start, counts) + offsets]
+
+    hit = (bx[j] > ax[i] - bw) & (bx[j] < ax[i] + aw) & (by[j] > ay[i] - bh) & (by[j] < ay[i] + ah)
+    return i[hit], j[hit]
+
+
+def cell_key(cx, cy):
+    return cx * 1000003 + cy
+
+
+class SwarmEngine:
+    """Aliens, bullets and enemy bullets as NumPy arrays instead of sprites.
+
+    step() moves everything, wraps aliens that fall off the bottom back to
+    the top (like Alien.update), lets aliens shoot and culls off-screen
+    bullets, all as whole-array operations. collide() resolves player
+    bullets against aliens with the same rule as groupcollide(aliens,
+    bullets, True, True), using slot order in place of group order.
+
+    images has the "alien", "bullet" and "enemy_bullet" Surfaces (their
+    sizes are the hitboxes), area is the screen's (width, height) and
+    get_ticks() the game time in ms; army.swarm_engine() passes army.py's.
+    """
+    def __init__(self, images, area, get_ticks, aliens=6, level=1, seed=None):
+        self.images = images
+        self.width, self.height = area
+        self.get_ticks = get_ticks
+        self.level = level
+        self.rng = np.random.default_rng(seed)
+        self.aliens = EntityArrays(images["alien"].get_size(), max(aliens, 16),
+                                   can_shoot=bool, last_shot=np.int64, shoot_delay=np.int64)
+        self.bullets = EntityArrays(images["bullet"].get_size(), 256)
+        self.enemy_bullets = EntityArrays(images["enemy_bullet"].get_size(), 256)
+        self.score = 0
+        self.spawn_aliens(aliens)
+
+    def spawn_aliens(self, count, slots=None):
+        """New aliens above the screen, same distributions as Alien.__init__"""
+        rng, level, now = self.rng, self.level, self.get_ticks()
+        aliens = self.aliens
+        if slots is None:
+            slots = aliens.spawn(count)
+        aliens.alive[slots] = True
+        aliens.x[slots] = rng.integers(0, self.width - aliens.width, count, endpoint=True)
+        aliens.y[slots] = rng.integers(-150, -40, count, endpoint=True)
+        aliens.speed[slots] = rng.integers(2, 4, count, endpoint=True) + 0.5 * (level - 1)
+        aliens.can_shoot[slots] = (level > 2) & (rng.random(count) < 0.3)
+        aliens.last_shot[slots] = now
+        aliens.shoot_delay[slots] = rng.integers(1000, 3000, count, endpoint=True)
+
+    def fire(self, x, y):
+        """Player bullet with its midbottom at (x, y)"""
+        bullets = self.bullets
+        bullets.spawn(1, x=x - bullets.width // 2, y=y - bullets.height, speed=-10)
+
+    def step(self):
+        now = self.get_ticks()
+        aliens, bullets, enemy_bullets = self.aliens, self.bullets, self.enemy_bullets
+
+        # Movement (dead slots move too, it's cheaper than masking)
+        aliens.y += aliens.speed
+        bullets.y += bullets.speed
+        enemy_bullets.y += enemy_bullets.speed
+
+        # Loop aliens back to the top when they go off-screen
+        wrapped = np.flatnonzero(aliens.alive & (aliens.y > self.height))
+        if len(wrapped):
+            aliens.y[wrapped] = self.rng.integers(-100, -40, len(wrapped), endpoint=True)
+            aliens.x[wrapped] = self.rng.integers(0, self.width - aliens.width, len(wrapped), endpoint=True)
+
+        # Aliens that can shoot fire downward from their midbottom
+        due = np.flatnonzero(aliens.alive & aliens.can_shoot & (now - aliens.last_shot > aliens.shoot_delay))
+        if len(due):
+            aliens.last_shot[due] = now
+            enemy_bullets.spawn(len(due),
+                                x=aliens.x[due] + (aliens.width - enemy_bullets.width) // 2,
+                                y=aliens.y[due] + aliens.height, speed=7)
+
+        # Cull bullets that left the screen
+        bullets.alive &= bullets.y + bullets.height >= 0
+        enemy_bullets.alive &= enemy_bullets.y <= self.height
+
+    def collide(self, respawn=True):
+        """Kill aliens hit by player bullets; returns the number of aliens killed"""
+        aliens, bullets = self.aliens, self.bullets
+        alien_slots, bullet_slots = aliens.live(), bullets.live()
+        i, j = overlap_pairs(aliens.x[alien_slots], aliens.y[alien_slots], (aliens.width, aliens.height),
+                             bullets.x[bullet_slots], bullets.y[bullet_slots], (bullets.width, bullets.height))
+        if not len(i):
+            return 0
+        # Every bullet touching an alien is used up, by the first alien it touches
+        order = np.lexsort((i, j))
+        i, j = i[order], j[order]
+        first = np.ones(len(j), bool)
+        first[1:] = j[1:] != j[:-1]
+        killed = alien_slots[np.unique(i[first])]
+        bullets.alive[bullet_slots[j]] = False
+        aliens.alive[killed] = False
+        self.score += 10 * self.level * len(killed)
+        if respawn:
+            # Replacement aliens reuse the freed slots
+            self.spawn_aliens(len(killed), killed)
+        return len(killed)
+
+    def hits(self, arrays, rect, kill=True):
+        """Slots of `arrays` whose boxes collide with rect"""
+        slots = arrays.live()
+        x, y = arrays.x[slots], arrays.y[slots]
+        touching = ((x < rect.right) & (x + arrays.width > rect.left) &
+                    (y < rect.bottom) & (y + arrays.height > rect.top))
+        slots = slots[touching]
+        if kill:
+            arrays.alive[slots] = False
+        return slots
+
+
+class SwarmView:
+    """Thin sprite-style adapter that draws a SwarmEngine onto a Surface or DrawList"""
+    def __init__(self, engine):
+        self.engine = engine
+        images = engine.images
+        self.layers = ((engine.aliens, images["alien"]),
+                       (engine.bullets, images["bullet"]),
+                       (engine.enemy_bullets, images["enemy_bullet"]))
+
+    def draw(self, target):
+        for arrays, image in self.layers:
+            slots = arrays.live()
+            xs = arrays.x[slots].astype(np.int32).tolist()
+            ys = arrays.y[slots].astype(np.int32).tolist()
+            target.blits([(image, (x, y)) for x, y in zip(xs, ys)], doreturn=False)
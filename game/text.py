@@ -0,0 +1,52 @@
+"""Cached text rendering shared by army.py and snake.py.
+
+font.render() rasterizes the whole string on every call, which adds up
+for a HUD that is drawn every frame. TextCache keeps recently rendered
+strings in an LRU cache, so a HUD line that didn't change since the last
+frame costs one dict lookup and one blit instead of a new render.
+"""
+from collections import OrderedDict
+
+
+class TextCache:
+    """Renders text through an LRU cache of font.render() results.
+
+    A cached string costs one dict lookup and one blit. A string that
+    isn't cached (the score changed, say) is rendered by font.render()
+    as before, so it looks exactly the same, and the least recently used
+    string makes room for it once `capacity` strings are cached.
+    """
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.strings = OrderedDict()  # (font, text, color) -> Surface, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text, color):
+        """font.render(text, True, color), cached"""
+        key = (font, text, color)
+        surf = self.strings.get(key)
+        if surf is not None:
+            self.hits += 1
+            self.strings.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = self.strings[key] = font.render(text, True, color)
+        if len(self.strings) > self.capacity:
+            self.strings.popitem(last=False)
+            self.evictions += 1
+        return surf
+
+    def size(self, font, text, color):
+        return self.render(font, text, color).get_size()
+
+    def draw(self, target, font, text, color, topleft):
+        target.blit(self.render(font, text, color), topleft)
+
+    def stats(self):
+        """Hit rate of the cache"""
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "cached": len(self.strings)}
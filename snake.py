@@ -1,14 +1,15 @@
 import pygame
-import time
-import random
+import sys
 
-# Initialize Pygame
-pygame.init()
+# The scene runner and friends live in the game package next to army.py
+from game.profiler import FrameProfiler, no_lap
+from game.scenes import Scene, run_scenes, wait_for_key
+from game.snake_rules import LEFT, RIGHT, UP, DOWN, SnakeGame
+from game.text import TextCache
 
-# Game window size
+# Game window size (the window itself is opened by init())
 width, height = 600, 400
-win = pygame.display.set_mode((width, height))
-pygame.display.set_caption("🐍 Snake Game - Enhanced")
+win = None
 
 # Colors
 WHITE = (255, 255, 255)
@@ -25,127 +26,191 @@ block_size = 20
 snake_speed = 12
 
 clock = pygame.time.Clock()
-font = pygame.font.SysFont("consolas", 22)
-big_font = pygame.font.SysFont("consolas", 40)
-
-
-def draw_grid():
-    for x in range(0, width, block_size):
-        pygame.draw.line(win, GRAY, (x, 0), (x, height))
-    for y in range(0, height, block_size):
-        pygame.draw.line(win, GRAY, (0, y), (width, y))
-
-
-def draw_snake(snake_list):
-    for segment in snake_list:
-        pygame.draw.rect(win, DARK_GREEN, [segment[0], segment[1], block_size, block_size], border_radius=5)
-
-
-def draw_food(x, y):
-    pygame.draw.ellipse(win, YELLOW, [x, y, block_size, block_size])
-
-
-def show_score(score):
-    value = font.render(f"Score: {score}", True, BLACK)
-    win.blit(value, [10, 10])
+font = big_font = None
+text_cache = TextCache()  # The score only needs new glyph blits, not a new render
+
+
+def init(lap=no_lap):
+    """Start pygame, open the window and load the fonts; later calls do nothing.
+
+    Nothing happens on import, so tools can import this file without a
+    window popping up. lap(step) is called after each step.
+    """
+    global win, font, big_font
+    if win is not None:
+        return win
+    pygame.init()
+    lap("pygame.init")
+    win = pygame.display.set_mode((width, height))
+    pygame.display.set_caption("🐍 Snake Game - Enhanced")
+    lap("set_mode")
+    font = pygame.font.SysFont("consolas", 22)
+    big_font = pygame.font.SysFont("consolas", 40)
+    lap("fonts")
+    return win
+
+
+def profile_startup():
+    """Time a cold start: every init() step, then the first frame.
+
+    Returns the FrameProfiler holding one sample per step ("frame" is the
+    total); --profile-startup prints it.
+    """
+    profiler = FrameProfiler()
+    profiler.begin(0)
+    init(lap=profiler.lap)
+    game = SnakeGame(width, height, block_size)
+    BoardRenderer(win).draw(game.body, game.food, game.score)
+    profiler.lap("first frame")
+    profiler.close()
+    return profiler
+
+
+class BoardRenderer:
+    """Draws the board by repainting only the cells that changed.
+
+    The white board with its grid lines is drawn once into a cached
+    background, and a body segment and the food are pre-rendered tiles.
+    After each move only the new head, the cell the tail left, the old and
+    new food cells and the score are repainted, and only they are passed
+    to pygame.display.update(), so a frame costs the same however long the
+    snake and however big the board. The first frame draws everything.
+    """
+    def __init__(self, target, display=True):
+        self.target = target
+        self.display = display
+        board_width, board_height = target.get_size()
+        self.background = pygame.Surface((board_width, board_height)).convert()
+        self.background.fill(WHITE)
+        for x in range(0, board_width, block_size):
+            pygame.draw.line(self.background, GRAY, (x, 0), (x, board_height))
+        for y in range(0, board_height, block_size):
+            pygame.draw.line(self.background, GRAY, (0, y), (board_width, y))
+        self.segment = pygame.Surface((block_size, block_size), pygame.SRCALPHA)
+        pygame.draw.rect(self.segment, DARK_GREEN, [0, 0, block_size, block_size], border_radius=5)
+        self.food_tile = pygame.Surface((block_size, block_size), pygame.SRCALPHA)
+        pygame.draw.ellipse(self.food_tile, YELLOW, [0, 0, block_size, block_size])
+        self.food = None
+        self.score = None
+        self.score_rect = pygame.Rect(10, 10, 0, 0)
+        self.full = True
+
+    def cells_under(self, rect):
+        left, top = rect.left // block_size * block_size, rect.top // block_size * block_size
+        return [(x, y) for x in range(left, rect.right, block_size) for y in range(top, rect.bottom, block_size)]
+
+    def paint(self, cell, body, food):
+        rect = pygame.Rect(cell[0], cell[1], block_size, block_size)
+        self.target.blit(self.background, rect, rect)
+        if cell == food:
+            self.target.blit(self.food_tile, rect)
+        if cell in body:
+            self.target.blit(self.segment, rect)
+        return rect
+
+    def draw(self, body, food, score):
+        """Show the board after body.move(); food is the food's cell"""
+        target = self.target
+        text = text_cache.render(font, f"Score: {score}", BLACK)
+        if self.full:
+            self.full = False
+            target.blit(self.background, (0, 0))
+            target.blit(self.food_tile, food)
+            for cell in body:
+                target.blit(self.segment, cell)
+            target.blit(text, (10, 10))
+            self.food, self.score = food, score
+            self.score_rect = text.get_rect(topleft=(10, 10))
+            if self.display:
+                pygame.display.update()
+            return
+
+        dirty = {food, self.food}
+        if body.vacated is not None:
+            dirty.add(body.vacated)
+        if body.cells:
+            dirty.add(body.cells[-1])
+        # The score sits on top of the cells under it, so they go together
+        under_score = self.cells_under(self.score_rect)
+        new_score_rect = text.get_rect(topleft=(10, 10))
+        if score != self.score or not dirty.isdisjoint(under_score):
+            dirty.update(under_score)
+            dirty.update(self.cells_under(new_score_rect))
+            redraw_score = True
+        else:
+            redraw_score = False
+        rects = [self.paint(cell, body, food) for cell in dirty]
+        if redraw_score:
+            target.blit(text, new_score_rect)
+            self.score_rect = new_score_rect
+        self.food, self.score = food, score
+        if self.display:
+            pygame.display.update(rects)
 
 
 def show_game_over(score):
     win.fill(WHITE)
-    msg1 = big_font.render("Game Over!", True, RED)
-    msg2 = font.render("Press C to Play Again or Q to Quit", True, BLACK)
-    msg3 = font.render(f"Final Score: {score}", True, BLUE)
+    msg1 = text_cache.render(big_font, "Game Over!", RED)
+    msg2 = text_cache.render(font, "Press C to Play Again or Q to Quit", BLACK)
+    msg3 = text_cache.render(font, f"Final Score: {score}", BLUE)
     win.blit(msg1, [width // 2 - 120, height // 3])
     win.blit(msg3, [width // 2 - 80, height // 3 + 50])
     win.blit(msg2, [width // 2 - 160, height // 3 + 100])
     pygame.display.update()
 
 
-def game_loop():
-    game_over = False
-    game_close = False
-
-    x = width // 2
-    y = height // 2
-    x_change = 0
-    y_change = 0
+# Arrow keys -> the directions SnakeGame.turn() takes
+KEY_DIRECTIONS = {pygame.K_LEFT: LEFT, pygame.K_RIGHT: RIGHT, pygame.K_UP: UP, pygame.K_DOWN: DOWN}
 
-    snake_list = []
-    snake_length = 1
 
-    food_x = random.randrange(0, width - block_size, block_size)
-    food_y = random.randrange(0, height - block_size, block_size)
+class PlayScene(Scene):
+    """One round of snake; ends in a GameOverScene or None if the window closes"""
+    def run(self):
+        init()
+        game = SnakeGame(width, height, block_size)
+        renderer = BoardRenderer(win)
 
-    while not game_over:
-
-        while game_close:
-            show_game_over(snake_length - 1)
+        while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    game_over = True
-                    game_close = False
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_q:
-                        game_over = True
-                        game_close = False
-                    if event.key == pygame.K_c:
-                        game_loop()
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                game_over = True
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT and x_change == 0:
-                    x_change = -block_size
-                    y_change = 0
-                elif event.key == pygame.K_RIGHT and x_change == 0:
-                    x_change = block_size
-                    y_change = 0
-                elif event.key == pygame.K_UP and y_change == 0:
-                    y_change = -block_size
-                    x_change = 0
-                elif event.key == pygame.K_DOWN and y_change == 0:
-                    y_change = block_size
-                    x_change = 0
-
-        # Boundary collision
-        if x >= width or x < 0 or y >= height or y < 0:
-            game_close = True
-
-        x += x_change
-        y += y_change
-
-        win.fill(WHITE)
-        draw_grid()
-        draw_food(food_x, food_y)
-
-        snake_head = [x, y]
-        snake_list.append(snake_head)
-
-        if len(snake_list) > snake_length:
-            del snake_list[0]
-
-        # Self-collision
-        for segment in snake_list[:-1]:
-            if segment == snake_head:
-                game_close = True
-
-        draw_snake(snake_list)
-        show_score(snake_length - 1)
-
-        pygame.display.update()
-
-        # Food collision
-        if x == food_x and y == food_y:
-            food_x = random.randrange(0, width - block_size, block_size)
-            food_y = random.randrange(0, height - block_size, block_size)
-            snake_length += 1
-
-        clock.tick(snake_speed)
+                    return None
+                if event.type == pygame.KEYDOWN and event.key in KEY_DIRECTIONS:
+                    game.turn(KEY_DIRECTIONS[event.key])
+
+            # Move, eat, and stop at a wall, the snake's own body or a full board
+            if not game.step():
+                return GameOverScene(game.score)
+
+            # Repaint just what changed
+            renderer.draw(game.body, game.food, game.score)
+
+            clock.tick(snake_speed)
+
+
+class GameOverScene(Scene):
+    """Final score screen; C starts a fresh round, Q or closing the window quits"""
+    def __init__(self, score):
+        self.score = score
+
+    def run(self):
+        show_game_over(self.score)
+        if wait_for_key((pygame.K_c, pygame.K_q)) == pygame.K_c:
+            return PlayScene()
+        return None
+
 
+def main():
+    init()
+    run_scenes(PlayScene())
     pygame.quit()
-    quit()
 
 
 # Start game
-game_loop()
+if __name__ == "__main__":
+    if "--profile-startup" in sys.argv:
+        profiler = profile_startup()
+        for step, stat in profiler.stats().items():
+            print(f"{'total' if step == 'frame' else step:<14}{stat['max']:>8.2f} ms")
+        pygame.quit()
+    else:
+        main()